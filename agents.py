@@ -3,17 +3,675 @@ AI Agents for Lead Discovery and Enrichment
 Uses LangChain patterns with SERP API for search
 """
 import re
+import smtplib
+import socket
+import uuid
+import threading
+import time
+import orjson
 import requests
-from typing import List, Dict, Optional
-from langchain_openai import ChatOpenAI
+from collections import OrderedDict
+from datetime import timedelta
+from functools import lru_cache
+from itertools import islice
+from urllib.parse import urlparse, urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util import Retry
+from bs4 import BeautifulSoup
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, List, Dict, Optional, Tuple
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain_core.messages import HumanMessage, SystemMessage
+from cache import TTLCache, SemanticCache, make_cache_key
 import config
 
 try:
-    from serpapi import GoogleSearch
-    SERPAPI_AVAILABLE = True
+    # Prefer the Lexbor backend; older selectolax releases only ship Modest
+    try:
+        from selectolax.lexbor import LexborHTMLParser as HTMLParser
+    except ImportError:
+        from selectolax.parser import HTMLParser
+    SELECTOLAX_AVAILABLE = True
 except ImportError:
-    SERPAPI_AVAILABLE = False
+    SELECTOLAX_AVAILABLE = False
+
+try:
+    import requests_cache
+    REQUESTS_CACHE_AVAILABLE = True
+except ImportError:
+    REQUESTS_CACHE_AVAILABLE = False
+
+try:
+    import dns.resolver
+    DNSPYTHON_AVAILABLE = True
+except ImportError:
+    DNSPYTHON_AVAILABLE = False
+
+SERPAPI_SEARCH_URL = "https://serpapi.com/search.json"
+TAVILY_SEARCH_URL = "https://api.tavily.com/search"
+FIRECRAWL_CRAWL_URL = "https://api.firecrawl.dev/v1/crawl"
+BROWSER_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+_EMAIL_RE = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b')
+_ASSET_EMAIL_RE = re.compile(r'\.(?:png|jpe?g|gif|svg|webp|bmp|ico|css|js)$')
+_BUSINESS_EMAIL_RE = re.compile(r'contact|info|hello|sales|business|inquiry|enquiry')
+_PLACEHOLDER_EMAIL_RE = re.compile(r'example\.com|test\.com|sample\.com|noreply|no-reply')
+
+# Sources that are never a company's own website (checked as plain substrings)
+_EXCLUDED_DOMAINS = (
+    "reddit.com", "quora.com", "medium.com", "linkedin.com/posts",
+    "facebook.com", "twitter.com", "x.com", "tripadvisor.com",
+    "yelp.com", "zomato.com", "timeout.com", "cntraveller.com",
+    "michelin.com", "theworlds50best.com", "seasonedtraveller.com", "qic.online",
+    "guide.michelin.com", ".blog", "wordpress.com", "substack.com",
+    "wellfound.com", "angel.co", "crunchbase.com", "pitchbook.com",
+    "bloomberg.com", "reuters.com", "forbes.com", "techcrunch.com",
+    "wikipedia.org", "wikimedia.org",
+)
+_PLATFORM_SUBDOMAINS = (
+    ".medium.com", ".wordpress.com", ".blogspot.com",
+    ".tumblr.com", ".wixsite.com", ".squarespace.com",
+)
+# Relevance-score vocabularies for search results
+_BUSINESS_TERM_RE = re.compile(r'contact|about|company|restaurant|cafe|hotel|business')
+_GENERIC_TERM_RE = re.compile(r'list|best|top|review|article|blog|news')
+_RESTAURANT_URL_RE = re.compile(r'restaurant|cafe|dining|bistro|eatery|food')
+# Page-content classification for guessed emails, and the mailbox names to try for each
+_RESTAURANT_CONTENT_RE = re.compile(r'restaurant|dining|food|menu|reservation|booking', re.IGNORECASE)
+_HOTEL_CONTENT_RE = re.compile(r'hotel|accommodation|stay|room', re.IGNORECASE)
+_GUESS_PREFIXES = {
+    "restaurant": ("contact", "info", "reservations", "booking", "hello", "inquiry"),
+    "hotel": ("contact", "info", "reservations", "booking", "hello"),
+    "general": ("contact", "info", "hello", "sales", "inquiry"),
+}
+_EXCLUDED_DOMAIN_RE = re.compile("|".join(map(re.escape, _EXCLUDED_DOMAINS)))
+# An article/post page: a content section followed by an item, e.g. /blog/my-post
+# (the section index itself, e.g. /blog/, is allowed)
+_ARTICLE_PATH_RE = re.compile(r'/(?:posts?|articles?|blogs?|news|stor(?:y|ies)|reviews?|lists?|guides?)/[^/?#]+')
+_PLATFORM_SUBDOMAIN_RE = re.compile("|".join(map(re.escape, _PLATFORM_SUBDOMAINS)))
+
+# Boilerplate that repeats on every page of a site and carries no company information
+_NAV_WORDS = frozenset([
+    "home", "menu", "about", "about us", "contact", "contact us", "services", "products",
+    "blog", "news", "careers", "team", "login", "log in", "sign in", "sign up", "register",
+    "search", "cart", "shop", "faq", "privacy policy", "terms", "terms of service",
+    "cookie policy", "accept", "accept all", "reject all", "skip to content", "read more",
+    "learn more", "back to top", "follow us", "share", "close", "english",
+])
+# A markdown line that is only a short link, e.g. "- [Pricing](/pricing)"
+_NAV_LINK_RE = re.compile(r'^[-*+]?\s*\[[^\]]{0,30}\]\([^)]*\)$')
+_MAX_PAGE_CHARS = 1500  # Per page, after boilerplate removal
+_MAX_PROMPT_CHARS = 3000  # Total scraped content sent to the LLM
+_MAX_HTML_BYTES = 200_000  # Page text is capped at 3000 chars, so the rest of a big page is never used
+
+# Static extraction instructions. Kept byte-identical across calls (no per-site values)
+# so the provider can serve the prompt prefix from its cache
+_EXTRACTION_SYSTEM_PROMPT = """You are an expert at extracting comprehensive structured information from company websites. Analyze the content deeply and extract all available details. Return only valid JSON without any additional text.
+
+Extract comprehensive information from the company website content in the user message (scraped from multiple pages).
+
+Extract and return as JSON with the following structure:
+{
+    "company_name": "official name of the company",
+    "description": "detailed description of what the company does, their products/services, and value proposition",
+    "website_url": "the website URL given in the user message",
+    "email": "contact email if found (PRIORITY: check contact pages, footer, 'Contact Us' sections, 'Get in Touch' sections, header, about page - look for patterns like contact@domain, info@domain, hello@domain, reservations@domain, booking@domain, sales@domain). If not explicitly found, suggest the most likely email based on the domain.",
+    "phone": "phone number if found, otherwise null",
+    "location": "city, country or address if mentioned",
+    "industry": "industry or sector the company operates in",
+    "company_size": "number of employees or size category if mentioned (e.g., '50-100 employees', 'startup', 'enterprise')",
+    "founded_year": "year company was founded if mentioned",
+    "pain_points": ["list", "of", "specific", "pain", "points", "or", "challenges", "they", "might", "face", "based", "on", "their", "industry", "and", "content"],
+    "recent_news": "any recent news, achievements, funding, partnerships, or milestones mentioned",
+    "social_media": {
+        "linkedin": "LinkedIn URL if found",
+        "twitter": "Twitter/X URL if found",
+        "facebook": "Facebook URL if found"
+    },
+    "key_features": ["list", "of", "key", "features", "or", "services", "they", "offer"],
+    "target_audience": "who their target customers are"
+}
+
+CRITICAL EMAIL EXTRACTION INSTRUCTIONS:
+- Search the ENTIRE content for email addresses, especially in:
+  * Contact pages
+  * Footer sections
+  * "Contact Us" or "Get in Touch" sections
+  * Header/navigation menus
+  * About pages
+- Look for email patterns matching the domain of the website URL
+- For restaurants: look for reservations@, booking@, contact@, info@, hello@
+- For businesses: look for contact@, info@, sales@, hello@, inquiry@
+- If no email is found in content, generate the most likely email based on the domain (e.g., contact@domain.com)
+- NEVER return null for email - always provide a best guess if not found
+
+Important:
+- Always include the website_url field with the website URL from the user message
+- Be thorough in extracting pain_points based on industry and company description
+- Extract as much detail as possible from the content"""
+
+
+def _read_capped(response: requests.Response, limit: int) -> bytes:
+    """Read a streamed response body, stopping once limit bytes have arrived"""
+    buffer = bytearray()
+    for chunk in response.iter_content(chunk_size=16384):
+        buffer.extend(chunk)
+        if len(buffer) >= limit:
+            break
+    return bytes(buffer)
+
+
+def _html_to_text(html: bytes) -> str:
+    """
+    Extract the readable text of an HTML page, without scripts, styles or navigation
+    Uses selectolax (Lexbor C parser) when installed, otherwise BeautifulSoup with lxml
+    """
+    if SELECTOLAX_AVAILABLE:
+        tree = HTMLParser(html)
+        for node in tree.css("script, style, nav, footer, header"):
+            node.decompose()
+        main_content = tree.css_first("main") or tree.css_first("article") or tree.body
+        return main_content.text(separator=" ", strip=True) if main_content else ""
+    
+    soup = BeautifulSoup(html, 'lxml')
+    
+    # Remove script and style elements
+    for script in soup(["script", "style", "nav", "footer", "header"]):
+        script.decompose()
+    
+    # Extract main content
+    main_content = soup.find('main') or soup.find('article') or soup.find('body')
+    if main_content:
+        return main_content.get_text()
+    return soup.get_text()
+
+
+def _compress_pages(all_content: List[Dict]) -> str:
+    """
+    Join scraped pages into one compact text for the LLM
+    Drops navigation lines and lines already seen on another page, and caps each page
+    """
+    seen = set()
+    sections = []
+    for item in all_content:
+        kept = []
+        size = 0
+        for line in item["content"].splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            key = line.lower()
+            if key in seen or key in _NAV_WORDS:
+                continue
+            if "@" not in line and _NAV_LINK_RE.match(line):
+                continue
+            seen.add(key)
+            kept.append(line)
+            size += len(line) + 1
+            if size >= _MAX_PAGE_CHARS:
+                break
+        if kept:
+            sections.append(f"Page: {item['url']}\n" + "\n".join(kept)[:_MAX_PAGE_CHARS])
+    return "\n---\n".join(sections)
+
+
+_PHONE_RE = re.compile(r'\+?\d[\d\s().-]{7,}\d')
+_PROFILE_WORDS_RE = re.compile(
+    r'\b(?:founded|since|established|headquartered|located|address|street|avenue|road|suite|'
+    r'team|ceo|founder|owner|industry|mission|specialize|specialise)\b',
+    re.IGNORECASE
+)
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+|\n+')
+_PREFILTER_EDGE_CHARS = 400  # Head and tail kept verbatim (header/footer contact details)
+_PREFILTER_BUDGET = 1500  # Characters of selected sentences between head and tail
+
+
+def _prefilter_content(text: str) -> str:
+    """
+    Condense long site text for the LLM: keep the head and tail, then the sentences
+    most likely to hold contact/company facts, then plain sentences while budget remains
+    """
+    if len(text) <= _MAX_PROMPT_CHARS:
+        return text
+    head = text[:_PREFILTER_EDGE_CHARS]
+    tail = text[-_PREFILTER_EDGE_CHARS:]
+    sentences = [sentence.strip() for sentence in _SENTENCE_SPLIT_RE.split(text[_PREFILTER_EDGE_CHARS:-_PREFILTER_EDGE_CHARS])]
+    sentences = [sentence for sentence in sentences if sentence]
+    
+    scores = [
+        3 * bool(_EMAIL_RE.search(sentence))
+        + 2 * bool(_PHONE_RE.search(sentence))
+        + 2 * bool(_PROFILE_WORDS_RE.search(sentence))
+        for sentence in sentences
+    ]
+    # Best-scoring first, then unscored sentences in page order (they carry the description)
+    order = sorted(range(len(sentences)), key=lambda i: (-scores[i], i))
+    keep = set()
+    used = 0
+    for i in order:
+        if used + len(sentences[i]) > _PREFILTER_BUDGET:
+            continue
+        keep.add(i)
+        used += len(sentences[i]) + 1
+    
+    body = " ".join(sentences[i] for i in sorted(keep))
+    return f"{head}\n...\n{body}\n...\n{tail}"
+
+
+_EXTRACTION_SYSTEM_MESSAGE = SystemMessage(content=_EXTRACTION_SYSTEM_PROMPT)
+_EXTRACTION_USER_TEMPLATE = """Website URL: {base_url}
+{facts_line}
+Company website content (scraped from multiple pages):
+
+{content}"""
+
+# Lead validation: static guidelines in the system message, the lead in the user message
+_VALIDATION_GUIDELINES = """Guidelines:
+- If searching for restaurants, accept restaurant review sites, food blogs, and dining guides as they are relevant
+- If searching for businesses, accept business directories, review sites, and related services
+- Be lenient - if there's any connection to the query, accept it
+- Only reject if completely unrelated (e.g., a restaurant site when searching for software companies)"""
+_VALIDATION_SYSTEM_MESSAGE = SystemMessage(content=f"""You are a lead validation expert. Be lenient and accept leads that are even loosely related to the search query. Answer only 'yes' or 'no'.
+
+Task: Determine if the lead is RELEVANT to the search query.
+
+{_VALIDATION_GUIDELINES}
+
+Answer only 'yes' or 'no'.""")
+_VALIDATION_USER_TEMPLATE = """Original search query: "{query}"
+
+Lead information:
+- Company: {company_name}
+- Description: {description}
+- Website: {website_url}"""
+
+
+# Packed validation: several numbered leads per prompt, one yes/no each in a JSON object
+_BATCH_VALIDATION_SYSTEM_MESSAGE = SystemMessage(content=f"""You are a lead validation expert. Be lenient and accept leads that are even loosely related to the search query.
+
+Task: For each numbered lead, determine if it is RELEVANT to the search query.
+
+{_VALIDATION_GUIDELINES}
+
+Return a JSON object {{"answers": [...]}} with one "yes" or "no" per lead, in the order given.""")
+_BATCH_VALIDATION_LEAD_TEMPLATE = "{number}. Company: {company_name} | Description: {description} | Website: {website_url}"
+
+
+# Contact facts that HTML-to-text loses: mailto/social hrefs and schema.org JSON-LD blocks
+_MAILTO_RE = re.compile(rb'mailto:([^"\'?>\s]+)', re.IGNORECASE)
+_SOCIAL_HREF_RE = re.compile(
+    rb'href=["\'](https?://(?:www\.)?(?:linkedin\.com/(?:company|in)/|twitter\.com/|x\.com/|facebook\.com/)[^"\'\s>]+)',
+    re.IGNORECASE
+)
+_JSON_LD_RE = re.compile(rb'<script[^>]+application/ld\+json[^>]*>(.*?)</script>', re.IGNORECASE | re.DOTALL)
+_SOCIAL_URL_RE = re.compile(
+    r'https?://(?:www\.)?(linkedin\.com/(?:company|in)/|twitter\.com/|x\.com/|facebook\.com/)[^\s)"\'<>\]]+',
+    re.IGNORECASE
+)
+_SOCIAL_PLATFORMS = {"linkedin.com/": "linkedin", "twitter.com/": "twitter", "x.com/": "twitter", "facebook.com/": "facebook"}
+_FOUNDED_RE = re.compile(r'\b(?:founded|established|since)\b:?\s*(?:in\s+)?((?:18|19|20)\d{2})\b', re.IGNORECASE)
+
+
+def _iter_json_ld(data):
+    """Yield every object in a JSON-LD document, including @graph members and nested values"""
+    if isinstance(data, list):
+        for item in data:
+            yield from _iter_json_ld(item)
+    elif isinstance(data, dict):
+        yield data
+        for value in data.values():
+            if isinstance(value, (dict, list)):
+                yield from _iter_json_ld(value)
+
+
+def _html_hints(html: bytes) -> str:
+    """Render mailto/social links and JSON-LD contact fields of a page as plain text"""
+    hints = [f"Email: {email.decode('utf-8', 'ignore')}" for email in _MAILTO_RE.findall(html)]
+    hints.extend(url.decode("utf-8", "ignore") for url in _SOCIAL_HREF_RE.findall(html))
+    for block in _JSON_LD_RE.findall(html):
+        try:
+            document = orjson.loads(block.strip())
+        except orjson.JSONDecodeError:
+            continue
+        for node in _iter_json_ld(document):
+            if isinstance(node.get("email"), str):
+                hints.append(f"Email: {node['email'].replace('mailto:', '')}")
+            if isinstance(node.get("telephone"), str):
+                hints.append(f"Telephone: {node['telephone']}")
+            if isinstance(node.get("foundingDate"), str):
+                hints.append(f"Founded: {node['foundingDate']}")
+            address = node.get("address")
+            if isinstance(address, dict):
+                parts = [address.get(key) for key in ("streetAddress", "addressLocality", "addressRegion", "addressCountry")]
+                address = ", ".join(part for part in parts if isinstance(part, str))
+            if isinstance(address, str) and address:
+                hints.append(f"Address: {address}")
+    return " | ".join(dict.fromkeys(hints))  # Dedupe, keep order
+
+
+# Words that carry no signal when comparing a lead against the search query
+_STOPWORDS = frozenset([
+    "the", "and", "for", "with", "from", "that", "this", "are", "our", "your", "you",
+    "near", "best", "top", "company", "companies", "business", "businesses", "services",
+    "find", "looking", "list", "based", "who", "what", "which", "into", "their", "they",
+    "has", "have", "all", "any", "more", "most", "new", "www", "com", "http", "https",
+])
+_TOKEN_RE = re.compile(r"\w{3,}")
+
+
+def _stem(token: str) -> str:
+    """Crude plural folding so 'dentists' matches 'dentist' and 'bakeries' matches 'bakery'"""
+    if token.endswith("ies") and len(token) > 5:
+        return token[:-3] + "y"
+    if token.endswith("s") and not token.endswith("ss") and len(token) > 4:
+        return token[:-1]
+    return token
+
+
+def _tokenize(text: str) -> set:
+    """Lowercased, plural-folded word tokens of a text, without stopwords"""
+    return {_stem(token) for token in _TOKEN_RE.findall(text.lower()) if token not in _STOPWORDS}
+
+
+@lru_cache(maxsize=256)
+def _query_tokens(query: str) -> frozenset:
+    """Tokens of a search query, computed once per query rather than once per lead"""
+    return frozenset(_tokenize(query))
+
+
+# Appended to every search: official-site terms, excluded article/directory sites,
+# and a nudge towards pages with contact details
+_QUERY_EXCLUDE_SUFFIX = (
+    " official website -site:reddit.com -site:quora.com -site:medium.com -site:linkedin.com/posts"
+    " -site:facebook.com -site:twitter.com -site:x.com"
+    " -site:tripadvisor.com -site:yelp.com -site:zomato.com -site:timeout.com -site:cntraveller.com"
+    " -site:michelin.com -site:theworlds50best.com -site:*.blog -site:*.wordpress.com"
+    " -site:*.medium.com -site:*.substack.com"
+    " contact information"
+)
+
+
+@lru_cache(maxsize=1024)
+def _enhance_search_query(query: str) -> str:
+    """Search query restricted to official business websites"""
+    return f"{query}{_QUERY_EXCLUDE_SUFFIX}"
+
+
+@lru_cache(maxsize=4096)
+def _normalize_url(url: str) -> str:
+    """Normalize URL to base domain"""
+    url = url.strip()
+    if not url.startswith(('http://', 'https://')):
+        url = 'https://' + url
+    # Remove path to get base URL
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+
+@lru_cache(maxsize=4096)
+def _split_domain(url: str) -> str:
+    """Get the host of a URL (lowercased) without scheme, port, path or leading www."""
+    # urlsplit only finds the host after "//", so scheme-less URLs get one
+    try:
+        hostname = urlsplit(url if "//" in url else f"//{url}").hostname or ""
+    except ValueError:  # e.g. an unbalanced IPv6 bracket
+        return ""
+    return hostname.removeprefix("www.")
+
+
+def _classify_content(content: str) -> str:
+    """Business category of a page for email guessing: restaurant, hotel or general"""
+    if content and _RESTAURANT_CONTENT_RE.search(content):
+        return "restaurant"
+    if content and _HOTEL_CONTENT_RE.search(content):
+        return "hotel"
+    return "general"
+
+
+@lru_cache(maxsize=4096)
+def _build_email_candidates(domain: str, category: str) -> Tuple[str, ...]:
+    """Likely addresses for a domain, most likely first"""
+    return tuple(f"{prefix}@{domain}" for prefix in _GUESS_PREFIXES[category])
+
+
+class _DNSCache:
+    """Bounded, thread-safe hostname -> IP addresses cache with a TTL per entry"""
+    
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Tuple[str, ...]]]" = OrderedDict()  # host -> (expires_at, ips)
+        self._lock = threading.Lock()
+    
+    def resolve(self, host: str) -> Tuple[str, ...]:
+        """All IP addresses of host in resolver order, from the cache when fresh; empty if it can't be resolved"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(host)
+                return entry[1]
+        try:
+            infos = socket.getaddrinfo(host, None, 0, socket.SOCK_STREAM)
+        except OSError:
+            return ()  # Negative answers aren't cached; the connection reports the error
+        # Keep every address (deduplicated) so connections can fall back like create_connection does
+        addresses = tuple(dict.fromkeys(info[4][0] for info in infos))
+        if not addresses:
+            return ()
+        with self._lock:
+            self._entries[host] = (now + self.ttl_seconds, addresses)
+            self._entries.move_to_end(host)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return addresses
+
+
+# Only the scraper session's connections use this cache (see _CachedDNSAdapter);
+# SMTP, Redis and OpenAI clients keep the system resolver
+_dns_cache = _DNSCache(config.DNS_CACHE_TTL_SECONDS, config.DNS_CACHE_MAX_ENTRIES)
+
+
+class _CachedDNSConnectionMixin:
+    """
+    Connect to the cached addresses of the host, trying each in turn (e.g. IPv6 first on a host without IPv6)
+    TLS SNI and certificate checks still use the hostname
+    """
+    
+    def _new_conn(self):
+        hostname = self._dns_host
+        addresses = _dns_cache.resolve(hostname)
+        if not addresses:
+            return super()._new_conn()  # Let urllib3 resolve and report the error
+        try:
+            for address in addresses[:-1]:
+                self._dns_host = address
+                try:
+                    return super()._new_conn()
+                except (NewConnectionError, ConnectTimeoutError):
+                    continue
+            self._dns_host = addresses[-1]
+            return super()._new_conn()
+        finally:
+            self._dns_host = hostname
+
+
+class _CachedDNSHTTPConnection(_CachedDNSConnectionMixin, HTTPConnection):
+    pass
+
+
+class _CachedDNSHTTPSConnection(_CachedDNSConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _CachedDNSHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _CachedDNSHTTPConnection
+
+
+class _CachedDNSHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _CachedDNSHTTPSConnection
+
+
+class _CachedDNSAdapter(HTTPAdapter):
+    """HTTPAdapter whose new connections resolve hostnames through _dns_cache"""
+    
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CachedDNSHTTPConnectionPool,
+            "https": _CachedDNSHTTPSConnectionPool,
+        }
+
+
+def _prewarm_dns(urls: List[str]):
+    """Resolve the hosts of many URLs concurrently so the scrapers start with warm DNS"""
+    hosts = set()
+    for url in urls:
+        if not url:
+            continue
+        try:
+            hosts.add(urlparse(_normalize_url(url)).hostname)
+        except ValueError:  # e.g. an unbalanced IPv6 bracket; the scrape of that URL reports it
+            continue
+    hosts.discard(None)
+    if not hosts:
+        return
+    # Unresolvable hosts fail fast later in the scrape
+    with ThreadPoolExecutor(max_workers=min(32, len(hosts))) as executor:
+        list(executor.map(_dns_cache.resolve, hosts))
+
+
+def _smtp_rcpt_code(mx_host: str, email: str) -> Optional[int]:
+    """Ask a mail server whether it accepts a recipient, without sending anything"""
+    try:
+        with smtplib.SMTP(mx_host, 25, timeout=config.EMAIL_VERIFY_TIMEOUT) as smtp:
+            smtp.helo()
+            smtp.mail(config.EMAIL_VERIFY_FROM)
+            code, _ = smtp.rcpt(email)
+            return code
+    except (smtplib.SMTPException, OSError):
+        return None
+
+
+_EMAIL_VERDICT_CACHE_SIZE = 1024
+_email_verdicts: "OrderedDict[tuple, Tuple[str, Optional[str]]]" = OrderedDict()
+_email_verdicts_lock = threading.Lock()
+
+
+def _verify_email_candidates(domain: str, candidates: Tuple[str, ...]) -> Tuple[str, Optional[str]]:
+    """
+    _probe_email_candidates, remembering conclusive verdicts per (domain, candidates)
+    "unknown" usually means a timeout or blocked port, so it is retried on the next call
+    """
+    key = (domain, candidates)
+    with _email_verdicts_lock:
+        cached = _email_verdicts.get(key)
+        if cached is not None:
+            _email_verdicts.move_to_end(key)
+            return cached
+    verdict = _probe_email_candidates(domain, candidates)
+    if verdict[0] != "unknown":
+        with _email_verdicts_lock:
+            _email_verdicts[key] = verdict
+            if len(_email_verdicts) > _EMAIL_VERDICT_CACHE_SIZE:
+                _email_verdicts.popitem(last=False)
+    return verdict
+
+
+def _probe_email_candidates(domain: str, candidates: Tuple[str, ...]) -> Tuple[str, Optional[str]]:
+    """
+    Probe candidate addresses on the domain's MX host in parallel
+    Returns ("verified", email), ("rejected", None) or ("unknown", None)
+    """
+    try:
+        answers = dns.resolver.resolve(domain, "MX", lifetime=config.EMAIL_VERIFY_TIMEOUT)
+    except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+        return "rejected", None  # A domain without MX records can't receive mail
+    except Exception:
+        return "unknown", None
+    mx_host = str(min(answers, key=lambda record: record.preference).exchange).rstrip(".")
+    
+    # A random address tells us whether the server accepts everything (catch-all)
+    probe = f"no-such-user-{uuid.uuid4().hex[:12]}@{domain}"
+    with ThreadPoolExecutor(max_workers=len(candidates) + 1) as executor:
+        codes = list(executor.map(lambda email: _smtp_rcpt_code(mx_host, email), (probe,) + candidates))
+    probe_code, candidate_codes = codes[0], codes[1:]
+    
+    if probe_code is None or probe_code == 250:
+        return "unknown", None
+    for email, code in zip(candidates, candidate_codes):
+        if code == 250:
+            return "verified", email
+    if all(code is not None and code >= 500 for code in candidate_codes):
+        return "rejected", None
+    return "unknown", None
+
+
+def _build_http_session() -> requests.Session:
+    """
+    Create a requests session with a pooled, retrying HTTP adapter
+    When requests-cache is installed, responses are also persisted to disk so
+    repeated searches and scrapes of the same URL are served without a network call
+    """
+    if config.HTTP_CACHE_ENABLED and REQUESTS_CACHE_AVAILABLE:
+        session = requests_cache.CachedSession(
+            config.HTTP_CACHE_PATH,
+            backend="sqlite",
+            expire_after=timedelta(days=3),  # Plain website GETs
+            urls_expire_after={
+                "api.firecrawl.dev/v1/crawl*": requests_cache.DO_NOT_CACHE,  # Job ids and live status
+                "serpapi.com": timedelta(days=1),
+                "api.tavily.com": timedelta(days=1),
+            },
+            allowable_methods=("GET", "POST"),  # POST bodies are part of the cache key
+            match_headers=False,
+            cache_control=True
+        )
+    else:
+        session = requests.Session()
+    # Browser UA for every request (HEAD probes included) and explicit keep-alive
+    session.headers.update({
+        "User-Agent": BROWSER_USER_AGENT,
+        "Connection": "keep-alive",
+    })
+    adapter_class = _CachedDNSAdapter if config.DNS_CACHE_ENABLED else HTTPAdapter
+    adapter = adapter_class(
+        pool_connections=50,
+        pool_maxsize=100,
+        # Retries (with jittered backoff and Retry-After) live here, not in the callers
+        max_retries=Retry(
+            total=2,
+            backoff_factor=1,
+            backoff_jitter=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            respect_retry_after_header=True,
+            allowed_methods=frozenset(["HEAD", "GET", "POST"]),
+            raise_on_status=False  # Hand back the last response instead of raising
+        )
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_shared_session: Optional[requests.Session] = None
+_shared_session_lock = threading.Lock()
+
+
+def _get_http_session() -> requests.Session:
+    """
+    The process-wide HTTP session, built on first use
+    Search, scraping and liveness probes share one connection pool (and one
+    requests-cache SQLite handle), so a host reached by any agent stays warm for all
+    """
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is None:
+            _shared_session = _build_http_session()
+        return _shared_session
 
 
 class LeadDiscoveryAgent:
@@ -22,13 +680,17 @@ class LeadDiscoveryAgent:
     def __init__(self):
         if not config.OPENAI_API_KEY:
             raise ValueError("OPENAI_API_KEY not set in config")
-        self.llm = ChatOpenAI(
-            model=config.LLM_MODEL,
-            temperature=0.7,
-            api_key=config.OPENAI_API_KEY
-        )
         self.serpapi_key = config.SERPAPI_API_KEY
         self.tavily_api_key = config.TAVILY_API_KEY
+        self.session = _get_http_session()  # Keep-alive connections; requests-cache keeps provider responses for a day
+        self.embeddings = (
+            OpenAIEmbeddings(model=config.EMBEDDING_MODEL, api_key=config.OPENAI_API_KEY)
+            if config.SEMANTIC_CACHE_ENABLED else None
+        )
+        self.query_cache = SemanticCache(
+            threshold=config.SEMANTIC_CACHE_THRESHOLD,
+            ttl_seconds=config.SEMANTIC_CACHE_TTL_HOURS * 3600
+        )
     
     def search_companies(self, query: str, max_results: int = 10) -> List[Dict]:
         """
@@ -36,129 +698,138 @@ class LeadDiscoveryAgent:
         Returns list of companies with their websites
         Enhanced to find specific business websites, not generic sources
         """
-        results = []
+        if not self.serpapi_key and not self.tavily_api_key:
+            # Final fallback: generate placeholder results
+            return self._generate_mock_results(query, max_results)
         
         try:
-            # Enhance query to find specific business websites
-            # Exclude Reddit, articles, directories, review sites
-            enhanced_query = self._enhance_search_query(query)
+            # Paraphrases of a recent query reuse its results instead of a paid search call
+            embedding = self._embed_query(query)
+            if embedding is not None:
+                cached = self.query_cache.get(embedding)
+                if cached and cached["max_results"] >= max_results:
+                    print(f"♻️  Reusing search results for a similar query: {cached['query']}")
+                    return cached["results"][:max_results]
             
-            # Use SERP API for web search (primary method)
-            if self.serpapi_key and SERPAPI_AVAILABLE:
-                search = GoogleSearch({
-                    "q": enhanced_query,
-                    "api_key": self.serpapi_key,
-                    "num": max_results * 2,  # Get more results to filter
-                    "engine": "google"
-                })
-                
-                search_results = search.get_dict()
-                
-                # Extract organic results and filter
-                if "organic_results" in search_results:
-                    for result in search_results["organic_results"]:
-                        url = result.get("link", "")
-                        title = result.get("title", "")
-                        
-                        # Filter out unwanted sources
-                        if self._is_valid_business_website(url, title):
-                            results.append({
-                                "title": title,
-                                "url": url,
-                                "content": result.get("snippet", ""),
-                                "score": self._calculate_relevance_score(result, query),
-                            })
-                            
-                            # Stop when we have enough valid results
-                            if len(results) >= max_results:
-                                break
-                
-                # Also check for knowledge graph results (company info)
-                if "knowledge_graph" in search_results:
-                    kg = search_results["knowledge_graph"]
-                    if "website" in kg:
-                        kg_url = kg.get("website", "")
-                        if self._is_valid_business_website(kg_url, kg.get("title", "")):
-                            results.insert(0, {
-                                "title": kg.get("title", ""),
-                                "url": kg_url,
-                                "content": kg.get("description", ""),
-                                "score": 1.0,
-                            })
-            
-            # Fallback to Tavily if SERP API not available
-            elif self.tavily_api_key:
-                enhanced_query = self._enhance_search_query(query)
-                tavily_url = "https://api.tavily.com/search"
-                response = requests.post(
-                    tavily_url,
-                    json={
-                        "api_key": self.tavily_api_key,
-                        "query": enhanced_query,
-                        "search_depth": "basic",
-                        "max_results": max_results * 2,
-                        "include_domains": [],
-                        "include_answer": True,
-                    },
-                    timeout=30
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    for result in data.get("results", []):
-                        url = result.get("url", "")
-                        title = result.get("title", "")
-                        
-                        # Filter out unwanted sources
-                        if self._is_valid_business_website(url, title):
-                            results.append({
-                                "title": title,
-                                "url": url,
-                                "content": result.get("content", ""),
-                                "score": result.get("score", 0),
-                            })
-                            
-                            if len(results) >= max_results:
-                                break
-            else:
-                # Final fallback: Use LLM to generate search suggestions
-                results = self._generate_mock_results(query, max_results)
-        
+            results = self._search_providers(query, max_results)
+            if embedding is not None and results:
+                self.query_cache.set(embedding, {"query": query, "max_results": max_results, "results": results})
+            return results
         except Exception as e:
             print(f"Search error: {e}")
-            results = self._generate_mock_results(query, max_results)
+            return self._generate_mock_results(query, max_results)
+    
+    def _embed_query(self, query: str) -> Optional[List[float]]:
+        """Embed a search query for the semantic cache (None when disabled or on error)"""
+        if not self.embeddings:
+            return None
+        try:
+            return self.embeddings.embed_query(query.strip().lower())
+        except Exception as e:
+            print(f"⚠️  Query embedding failed, skipping semantic cache: {e}")
+            return None
+    
+    def _search_providers(self, query: str, max_results: int) -> List[Dict]:
+        """Run the search against SerpAPI, or Tavily when SerpAPI isn't configured"""
+        results = []
+        
+        # Enhance query to find specific business websites
+        # Exclude Reddit, articles, directories, review sites
+        enhanced_query = self._enhance_search_query(query)
+        
+        # Use SERP API for web search (primary method)
+        if self.serpapi_key:
+            # Get more results than needed to filter
+            search_results = self._fetch_serpapi(enhanced_query, max_results * 2)
+            
+            # Filter lazily and stop at max_results: rejected hits cost one check, no dict
+            valid_hits = (
+                result for result in search_results.get("organic_results", [])
+                if self._is_valid_business_website(result.get("link", ""), result.get("title", ""))
+            )
+            results = [
+                {
+                    "title": result.get("title", ""),
+                    "url": result.get("link", ""),
+                    "content": result.get("snippet", ""),
+                    "score": self._calculate_relevance_score(result, query),
+                }
+                for result in islice(valid_hits, max_results)
+            ]
+            
+            # Also check for knowledge graph results (company info)
+            if "knowledge_graph" in search_results:
+                kg = search_results["knowledge_graph"]
+                if "website" in kg:
+                    kg_url = kg.get("website", "")
+                    if self._is_valid_business_website(kg_url, kg.get("title", "")):
+                        results.insert(0, {
+                            "title": kg.get("title", ""),
+                            "url": kg_url,
+                            "content": kg.get("description", ""),
+                            "score": 1.0,
+                        })
+        
+        # Fallback to Tavily if SERP API not available
+        elif self.tavily_api_key:
+            data = self._fetch_tavily(enhanced_query, max_results * 2)
+            if data:
+                valid_hits = (
+                    result for result in data.get("results", [])
+                    if self._is_valid_business_website(result.get("url", ""), result.get("title", ""))
+                )
+                results = [
+                    {
+                        "title": result.get("title", ""),
+                        "url": result.get("url", ""),
+                        "content": result.get("content", ""),
+                        "score": result.get("score", 0),
+                    }
+                    for result in islice(valid_hits, max_results)
+                ]
         
         return results
     
+    def _fetch_serpapi(self, enhanced_query: str, num: int) -> Dict:
+        """Call the SerpAPI endpoint through our own session so it is pooled"""
+        response = self.session.get(
+            SERPAPI_SEARCH_URL,
+            params={
+                "q": enhanced_query,
+                "api_key": self.serpapi_key,
+                "num": num,
+                "engine": "google"
+            },
+            timeout=30
+        )
+        response.raise_for_status()
+        return orjson.loads(response.content)
+    
+    def _fetch_tavily(self, enhanced_query: str, num: int) -> Optional[Dict]:
+        """Call the Tavily search API; None when the request is rejected"""
+        response = self.session.post(
+            TAVILY_SEARCH_URL,
+            data=orjson.dumps({
+                "api_key": self.tavily_api_key,
+                "query": enhanced_query,
+                "search_depth": "basic",
+                "max_results": num,
+                "include_domains": [],
+                "include_answer": True,
+            }),
+            headers={"Content-Type": "application/json"},
+            timeout=30
+        )
+        if response.status_code != 200:
+            return None
+        return orjson.loads(response.content)
+    
     def _enhance_search_query(self, query: str) -> str:
         """
         Enhance search query to find specific business websites
         Excludes generic sources like Reddit, articles, directories
         """
-        # Add terms to find official websites
-        enhanced = f"{query} official website -site:reddit.com -site:quora.com -site:medium.com -site:linkedin.com/posts -site:facebook.com -site:twitter.com -site:x.com"
-        
-        # Exclude common article and directory sites
-        exclude_sites = [
-            "-site:tripadvisor.com",
-            "-site:yelp.com",
-            "-site:zomato.com",
-            "-site:timeout.com",
-            "-site:cntraveller.com",
-            "-site:michelin.com",
-            "-site:theworlds50best.com",
-            "-site:*.blog",
-            "-site:*.wordpress.com",
-            "-site:*.medium.com",
-            "-site:*.substack.com"
-        ]
-        
-        enhanced += " " + " ".join(exclude_sites)
-        
-        # Add terms to prioritize business websites
-        enhanced += " contact information"
-        
-        return enhanced
+        return _enhance_search_query(query)
     
     def _is_valid_business_website(self, url: str, title: str) -> bool:
         """
@@ -168,71 +839,15 @@ class LeadDiscoveryAgent:
             return False
         
         url_lower = url.lower()
-        title_lower = title.lower()
         
         # Exclude unwanted domains
-        excluded_domains = [
-            "reddit.com",
-            "quora.com",
-            "medium.com",
-            "linkedin.com/posts",
-            "facebook.com",
-            "twitter.com",
-            "x.com",
-            "tripadvisor.com",
-            "yelp.com",
-            "zomato.com",
-            "timeout.com",
-            "cntraveller.com",
-            "michelin.com",
-            "theworlds50best.com",
-            "seasonedtraveller.com",
-            "qic.online",
-            "guide.michelin.com",
-            ".blog",
-            "wordpress.com",
-            "substack.com",
-            "wellfound.com",
-            "angel.co",
-            "crunchbase.com",
-            "pitchbook.com",
-            "bloomberg.com",
-            "reuters.com",
-            "forbes.com",
-            "techcrunch.com",
-            "wikipedia.org",
-            "wikimedia.org"
-        ]
-        
-        # Check if URL contains excluded domains
-        for domain in excluded_domains:
-            if domain in url_lower:
-                return False
+        if _EXCLUDED_DOMAIN_RE.search(url_lower):
+            return False
         
         # Exclude if it's clearly an article or post
-        excluded_paths = [
-            "/post/",
-            "/posts/",
-            "/article/",
-            "/articles/",
-            "/blog/",
-            "/news/",
-            "/story/",
-            "/stories/",
-            "/review/",
-            "/reviews/",
-            "/list/",
-            "/lists/",
-            "/guide/",
-            "/guides/"
-        ]
-        
-        for path in excluded_paths:
-            if path in url_lower:
-                # Allow if it's the main page (e.g., /blog/ without additional path)
-                if url_lower.count("/") <= 3:  # Allow main blog pages
-                    continue
-                return False
+        # Allow if it's the main page (e.g., /blog/ without additional path)
+        if _ARTICLE_PATH_RE.search(url_lower):
+            return False
         
         # Prefer URLs that look like business websites
         # Should have a domain that's not a subdomain of a large platform
@@ -244,18 +859,8 @@ class LeadDiscoveryAgent:
             return True
         
         # Exclude if it's a subdomain of a known platform
-        platform_subdomains = [
-            ".medium.com",
-            ".wordpress.com",
-            ".blogspot.com",
-            ".tumblr.com",
-            ".wixsite.com",
-            ".squarespace.com"
-        ]
-        
-        for platform in platform_subdomains:
-            if platform in url_lower:
-                return False
+        if _PLATFORM_SUBDOMAIN_RE.search(url_lower):
+            return False
         
         return True
     
@@ -266,27 +871,15 @@ class LeadDiscoveryAgent:
         """
         url = result.get("link", "").lower()
         title = result.get("title", "").lower()
-        snippet = result.get("snippet", "").lower()
-        query_lower = original_query.lower()
+        haystack = f"{url} {title}"
         
         score = 1.0
-        
-        # Boost score for business-related terms in URL
-        business_terms = ["contact", "about", "company", "restaurant", "cafe", "hotel", "business"]
-        for term in business_terms:
-            if term in url or term in title:
-                score += 0.2
-        
+        # Boost score for business-related terms in URL or title (each distinct term once)
+        score += 0.2 * len(set(_BUSINESS_TERM_RE.findall(haystack)))
         # Boost score if query terms appear in title
-        query_words = query_lower.split()
-        matches = sum(1 for word in query_words if word in title)
-        score += matches * 0.1
-        
+        score += 0.1 * sum(1 for word in original_query.lower().split() if word in title)
         # Reduce score for generic terms
-        generic_terms = ["list", "best", "top", "review", "article", "blog", "news"]
-        for term in generic_terms:
-            if term in title or term in url:
-                score -= 0.1
+        score -= 0.1 * len(set(_GENERIC_TERM_RE.findall(haystack)))
         
         return max(0.1, min(1.0, score))  # Clamp between 0.1 and 1.0
     
@@ -311,10 +904,24 @@ class LeadEnrichmentAgent:
             raise ValueError("OPENAI_API_KEY not set in config")
         self.llm = ChatOpenAI(
             model=config.LLM_MODEL,
-            temperature=0.3,
-            api_key=config.OPENAI_API_KEY
+            temperature=0,  # Deterministic extraction: stable answers for cached prompts
+            api_key=config.OPENAI_API_KEY,
+            max_retries=3,  # Concurrent batches hit rate limits; let the client back off and retry
+            model_kwargs={"response_format": {"type": "json_object"}}  # Always return parseable JSON
         )
         self.firecrawl_api_key = config.FIRECRAWL_API_KEY
+        self.session = _get_http_session()  # Shared by all page fetches, threads and agents
+        # Extractions are deterministic for the same content, so re-scraped sites skip the LLM
+        self.extraction_cache = (
+            TTLCache("extraction", ttl_seconds=config.LLM_CACHE_TTL_DAYS * 86400)
+            if config.LLM_CACHE_ENABLED else None
+        )
+        # Long-lived pools shared by every caller: one slot per site being enriched,
+        # and a separate one for page-level fetches (so site tasks never wait on their own pool)
+        self.site_executor = ThreadPoolExecutor(max_workers=config.ENRICH_CONCURRENCY, thread_name_prefix="site-enrich")
+        # Hosts the two legs of the Firecrawl/requests race; both legs only submit to page_executor
+        self.race_executor = ThreadPoolExecutor(max_workers=config.ENRICH_CONCURRENCY * 2, thread_name_prefix="scrape-race")
+        self.page_executor = ThreadPoolExecutor(max_workers=config.PAGE_FETCH_WORKERS, thread_name_prefix="page-fetch")
     
     def scrape_website(self, url: str) -> Optional[Dict]:
         """
@@ -323,416 +930,489 @@ class LeadEnrichmentAgent:
         Uses Firecrawl if available, otherwise falls back to requests + LLM
         """
         try:
-            # Normalize URL
-            base_url = self._normalize_url(url)
-            website_url = base_url  # Store the main website URL
-            
-            # Collect content from multiple pages
-            # Context-aware page selection based on URL and query
-            all_content = []
-            pages_to_scrape = [base_url]  # Always start with homepage
-            
-            # Add context-specific pages
-            # For restaurants: prioritize contact, reservations, about pages
-            url_lower = base_url.lower()
-            if any(term in url_lower for term in ["restaurant", "cafe", "dining", "bistro", "eatery", "food"]):
-                pages_to_scrape.extend([
-                    f"{base_url}/contact",
-                    f"{base_url}/reservations",
-                    f"{base_url}/book-a-table",
-                    f"{base_url}/about",
-                    f"{base_url}/menu"
-                ])
-            else:
-                # General business pages
-                pages_to_scrape.extend([
-                    f"{base_url}/contact",
-                    f"{base_url}/about",
-                    f"{base_url}/company",
-                    f"{base_url}/team"
-                ])
-            
-            # Try Firecrawl first (better for deep scraping)
-            if self.firecrawl_api_key:
-                scraped_data = self._deep_scrape_with_firecrawl(pages_to_scrape, base_url)
-                if scraped_data:
-                    scraped_data["website_url"] = website_url  # Always include website URL
-                    return scraped_data
-                # If Firecrawl fails, fall through to requests fallback
-            
-            # Fallback: scrape with requests (more reliable for timeout-prone sites)
-            scraped_data = self._deep_scrape_with_requests(pages_to_scrape, base_url)
-            if scraped_data:
-                scraped_data["website_url"] = website_url  # Always include website URL
-                return scraped_data
-            
+            collected = self._collect_site_content(url)
+            if not collected:
+                return None
+            content, base_url, scraped_pages = collected
+            scraped_data = self._extract_info_from_content(content, base_url, scraped_pages)
+            scraped_data["website_url"] = base_url  # Always include website URL
+            return scraped_data
+        except Exception as e:
+            print(f"Scraping error for {url}: {e}")
+            return None
+    
+    def scrape_websites(self, urls: List[str]) -> List[Optional[Dict]]:
+        """
+        Deep scrape several websites, batching their LLM extractions together
+        Returns one result per input URL (None where nothing could be scraped)
+        """
+        if not urls:
+            return []
+        if config.DNS_CACHE_ENABLED:
+            _prewarm_dns(urls)
+        # Sites are independent, so scrape them in parallel over the shared session
+        collected = list(self.site_executor.map(self._safe_collect_site_content, urls))
+        
+        items = [item for item in collected if item]
+        extracted = iter(self.extract_batch(items))
+        
+        results = []
+        for item in collected:
+            if not item:
+                results.append(None)
+                continue
+            scraped_data = next(extracted)
+            scraped_data["website_url"] = item[1]  # Always include website URL
+            results.append(scraped_data)
+        return results
+    
+    def _safe_collect_site_content(self, url: str) -> Optional[Tuple[str, str, List[str]]]:
+        """Collect site content, logging errors instead of raising"""
+        if not url:
             return None
+        try:
+            return self._collect_site_content(url)
         except Exception as e:
             print(f"Scraping error for {url}: {e}")
             return None
     
-    def _normalize_url(self, url: str) -> str:
-        """Normalize URL to base domain"""
-        url = url.strip()
-        if not url.startswith(('http://', 'https://')):
-            url = 'https://' + url
-        # Remove path to get base URL
-        from urllib.parse import urlparse
-        parsed = urlparse(url)
-        return f"{parsed.scheme}://{parsed.netloc}"
-    
-    def _deep_scrape_with_firecrawl(self, urls: List[str], base_url: str) -> Optional[Dict]:
-        """Deep scrape multiple pages using Firecrawl with retry logic and timeout handling"""
-        import time
-        all_content = []
-        successful_pages = []
-        
-        # Limit pages and prioritize homepage
-        priority_urls = [urls[0]] if urls else []  # Always try homepage first
-        other_urls = urls[1:3] if len(urls) > 1 else []  # Try up to 2 additional pages
-        
-        for url in priority_urls + other_urls:
-            max_retries = 2
-            retry_delay = 1
-            
-            for attempt in range(max_retries):
-                try:
-                    firecrawl_url = "https://api.firecrawl.dev/v0/scrape"
-                    headers = {
-                        "Authorization": f"Bearer {self.firecrawl_api_key}",
-                        "Content-Type": "application/json"
-                    }
-                    
-                    # Shorter timeout for faster failure and retry
-                    timeout = 15 if attempt == 0 else 10
-                    
-                    response = requests.post(
-                        firecrawl_url,
-                        json={"url": url},
-                        headers=headers,
-                        timeout=timeout
-                    )
-                    
-                    if response.status_code == 200:
-                        data = response.json()
-                        markdown_content = data.get("data", {}).get("markdown", "")
-                        if markdown_content:
-                            all_content.append({
-                                "url": url,
-                                "content": markdown_content[:3000]  # Limit per page
-                            })
-                            successful_pages.append(url)
-                            break  # Success, move to next URL
-                    elif response.status_code == 429:
-                        # Rate limited, wait longer
-                        if attempt < max_retries - 1:
-                            time.sleep(retry_delay * 2)
-                            continue
-                
-                except requests.exceptions.Timeout:
-                    if attempt < max_retries - 1:
-                        # Log but don't print error - timeouts are expected for some sites
-                        print(f"⚠️  Timeout scraping {url} (attempt {attempt + 1}/{max_retries}), retrying...")
-                        time.sleep(retry_delay)
-                        retry_delay *= 2  # Exponential backoff
-                    else:
-                        # Final attempt failed, skip this URL
-                        print(f"⚠️  Skipping {url} after {max_retries} timeout attempts")
-                        continue
-                
-                except requests.exceptions.RequestException as e:
-                    # Network errors - log but continue
-                    if attempt < max_retries - 1:
-                        print(f"⚠️  Network error for {url} (attempt {attempt + 1}/{max_retries}): {str(e)[:50]}")
-                        time.sleep(retry_delay)
-                        retry_delay *= 2
-                    else:
-                        print(f"⚠️  Skipping {url} due to network error")
-                        continue
-                
-                except Exception as e:
-                    # Other errors - log and skip
-                    print(f"⚠️  Error scraping {url}: {str(e)[:100]}")
-                    break  # Don't retry for other errors
-        
-        # If we have at least the homepage, proceed
-        if all_content:
-            # Combine all content
-            combined_content = "\n\n---PAGE BREAK---\n\n".join([
-                f"Page: {item['url']}\n{item['content']}" 
-                for item in all_content
+    def _collect_site_content(self, url: str) -> Optional[Tuple[str, str, List[str]]]:
+        """
+        Scrape the relevant pages of a website without running extraction
+        Returns (combined_content, base_url, scraped_pages) or None if nothing was scraped
+        """
+        # Normalize URL
+        base_url = self._normalize_url(url)
+        
+        # Collect content from multiple pages
+        # Context-aware page selection based on URL and query
+        pages_to_scrape = [base_url]  # Always start with homepage
+        
+        # Add context-specific pages
+        # For restaurants: prioritize contact, reservations, about pages
+        url_lower = base_url.lower()
+        if _RESTAURANT_URL_RE.search(url_lower):
+            pages_to_scrape.extend([
+                f"{base_url}/contact",
+                f"{base_url}/reservations",
+                f"{base_url}/book-a-table",
+                f"{base_url}/about",
+                f"{base_url}/menu"
+            ])
+        else:
+            # General business pages
+            pages_to_scrape.extend([
+                f"{base_url}/contact",
+                f"{base_url}/about",
+                f"{base_url}/company",
+                f"{base_url}/team"
             ])
-            return self._extract_info_from_content(combined_content, base_url, successful_pages)
         
-        # If Firecrawl failed completely, return None to trigger fallback
-        return None
-    
-    def _deep_scrape_with_requests(self, urls: List[str], base_url: str) -> Optional[Dict]:
-        """Deep scrape multiple pages using requests + BeautifulSoup"""
-        all_content = []
-        successful_pages = []
+        # A host that doesn't exist or refuses connections fails here in seconds instead of after a long crawl
+        if not self._is_host_reachable(base_url):
+            print(f"⚠️  Skipping {base_url}: homepage unreachable")
+            return None
         
+        if self.firecrawl_api_key:
+            # Firecrawl (one crawl job for all pages) and plain requests race; first with content wins
+            all_content = self._race_scrapers(base_url, pages_to_scrape[1:])
+        else:
+            all_content = self._scrape_with_requests(base_url, pages_to_scrape[1:])
+        
+        if not all_content:
+            return None
+        
+        # Combine all content, without the boilerplate repeated across pages
+        combined_content = _compress_pages(all_content)
+        return combined_content, base_url, [item["url"] for item in all_content]
+    
+    def _normalize_url(self, url: str) -> str:
+        """Normalize URL to base domain"""
+        return _normalize_url(url)
+    
+    def _race_scrapers(self, base_url: str, candidate_pages: List[str]) -> List[Dict]:
+        """Run the Firecrawl and requests scrapers in parallel and keep the first non-empty result"""
+        cancel_crawl = threading.Event()
+        futures = [
+            self.race_executor.submit(self._crawl_with_firecrawl, base_url, candidate_pages, cancel_crawl),
+            self.race_executor.submit(self._scrape_with_requests, base_url, candidate_pages),
+        ]
+        pending = set(futures)
         try:
-            from bs4 import BeautifulSoup
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pages = future.result()
+                    if pages:
+                        return pages
+            return []
+        finally:
+            cancel_crawl.set()  # Stop polling (and cancel the job) if requests won
+    
+    def _scrape_with_requests(self, base_url: str, candidate_pages: List[str]) -> List[Dict]:
+        """requests path: scrape the homepage plus the candidate pages that exist"""
+        # Drop sub-pages that don't exist before spending a GET on them
+        return self._deep_scrape_with_requests([base_url] + self._live_urls(candidate_pages))
+    
+    def _live_urls(self, urls: List[str]) -> List[str]:
+        """HEAD-probe candidate pages concurrently and keep the ones that respond"""
+        if not urls:
+            return []
+        alive = list(self.page_executor.map(self._is_url_live, urls))
+        return [url for url, ok in zip(urls, alive) if ok]
+    
+    def _is_url_live(self, url: str) -> bool:
+        """Cheap existence check for a page (no body download)"""
+        try:
+            response = self.session.head(url, allow_redirects=True, timeout=3)
+            # Some servers refuse HEAD outright; give those the benefit of the doubt
+            return response.status_code < 400 or response.status_code == 405
+        except requests.exceptions.RequestException:
+            return False
+    
+    def _is_host_reachable(self, url: str) -> bool:
+        """
+        False only on a connection-level failure (DNS error, refused connection, connect timeout)
+        Any HTTP answer counts, even 403/404/429: bot-protected sites often reject HEAD but Firecrawl can still scrape them
+        """
+        try:
+            self.session.head(url, allow_redirects=True, timeout=3)
+        except requests.exceptions.SSLError:
+            return True  # The host answered; Firecrawl may still get through
+        except requests.exceptions.ConnectionError:  # Includes ConnectTimeout
+            return False
+        except requests.exceptions.RequestException:
+            return True  # Read timeouts, redirect loops, ...: the server is there
+        return True
+    
+    def _crawl_with_firecrawl(self, base_url: str, candidate_pages: List[str],
+                              cancel: Optional[threading.Event] = None) -> List[Dict]:
+        """
+        Crawl a site with a single Firecrawl /v1/crawl job instead of one scrape call per page
+        The homepage is always included; other pages are limited to the candidate paths
+        Setting cancel stops polling and cancels the job
+        """
+        cancel = cancel or threading.Event()
+        headers = {
+            "Authorization": f"Bearer {self.firecrawl_api_key}",
+            "Content-Type": "application/json"
+        }
+        include_paths = [urlparse(page).path.strip("/") + ".*" for page in candidate_pages]
+        try:
+            response = self.session.post(
+                FIRECRAWL_CRAWL_URL,
+                data=orjson.dumps({
+                    "url": base_url,
+                    "includePaths": include_paths,
+                    "maxDepth": 1,
+                    "limit": 4,
+                    "scrapeOptions": {"formats": ["markdown"], "onlyMainContent": True},
+                }),
+                headers=headers,
+                timeout=(5, 15)  # (connect, read)
+            )
+            if response.status_code != 200:
+                print(f"⚠️  Firecrawl crawl rejected for {base_url}: HTTP {response.status_code}")
+                return []
+            job_id = orjson.loads(response.content).get("id")
+            if not job_id:
+                return []
             
-            for url in urls[:3]:  # Limit to 3 pages
-                try:
-                    # Shorter timeout for faster fallback
-                    response = requests.get(url, headers=headers, timeout=8, allow_redirects=True)
-                    if response.status_code == 200:
-                        soup = BeautifulSoup(response.content, 'html.parser')
-                        
-                        # Remove script and style elements
-                        for script in soup(["script", "style", "nav", "footer", "header"]):
-                            script.decompose()
-                        
-                        # Extract main content
-                        main_content = soup.find('main') or soup.find('article') or soup.find('body')
-                        if main_content:
-                            text = main_content.get_text()
-                        else:
-                            text = soup.get_text()
-                        
-                        # Clean up text
-                        lines = (line.strip() for line in text.splitlines())
-                        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-                        text = ' '.join(chunk for chunk in chunks if chunk)
-                        
-                        if text and len(text) > 100:  # Only add if meaningful content
-                            all_content.append({
-                                "url": url,
-                                "content": text[:3000]  # Limit per page
-                            })
-                            successful_pages.append(url)
-                except Exception as e:
-                    print(f"Error scraping {url}: {e}")
+            # Poll the job with a short, growing delay
+            delay = 1.0
+            deadline = time.monotonic() + 45
+            while time.monotonic() < deadline:
+                if cancel.wait(delay):
+                    self.session.delete(f"{FIRECRAWL_CRAWL_URL}/{job_id}", headers=headers, timeout=(5, 10))
+                    return []
+                delay = min(delay * 1.5, 4.0)
+                status = self.session.get(f"{FIRECRAWL_CRAWL_URL}/{job_id}", headers=headers, timeout=(5, 15))
+                if status.status_code != 200:
                     continue
+                job = orjson.loads(status.content)
+                if job.get("status") == "completed":
+                    return [
+                        {
+                            "url": page.get("metadata", {}).get("sourceURL", base_url),
+                            "content": page["markdown"][:3000]  # Limit per page
+                        }
+                        for page in job.get("data", [])
+                        if page.get("markdown")
+                    ]
+                if job.get("status") in ("failed", "cancelled"):
+                    break
+            print(f"⚠️  Firecrawl crawl did not finish for {base_url}")
+        
+        except requests.exceptions.RequestException as e:
+            print(f"⚠️  Skipping Firecrawl for {base_url} due to network error: {str(e)[:50]}")
+        
         except Exception as e:
-            print(f"Requests scraping error: {e}")
+            print(f"⚠️  Error crawling {base_url}: {str(e)[:100]}")
         
-        if all_content:
-            # Combine all content
-            combined_content = "\n\n---PAGE BREAK---\n\n".join([
-                f"Page: {item['url']}\n{item['content']}" 
-                for item in all_content
-            ])
-            return self._extract_info_from_content(combined_content, base_url, successful_pages)
+        return []
+    
+    def _deep_scrape_with_requests(self, urls: List[str]) -> List[Dict]:
+        """Deep scrape multiple pages using requests + an HTML parser"""
+        return self._fetch_pages_concurrently(self._scrape_page_with_requests, urls[:3])  # Limit to 3 pages
+    
+    def _scrape_page_with_requests(self, url: str) -> Optional[Dict]:
+        """Fetch a single page with requests and extract its readable text"""
+        try:
+            # Shorter timeout for faster fallback; stream so huge pages are not downloaded in full
+            with self.session.get(url, timeout=8, allow_redirects=True, stream=True) as response:
+                if response.status_code != 200:
+                    return None
+                html = _read_capped(response, _MAX_HTML_BYTES)
+            if html:
+                text = _html_to_text(html)
+                
+                # Collapse whitespace (boilerplate tags are already dropped at the DOM level)
+                text = " ".join(text.split())
+                # Put link/JSON-LD facts first so the page cap never cuts them off
+                hints = _html_hints(html)
+                if hints:
+                    text = f"{hints}\n{text}"
+                
+                if text and len(text) > 100:  # Only add if meaningful content
+                    return {
+                        "url": url,
+                        "content": text[:3000]  # Limit per page
+                    }
+        except Exception as e:
+            print(f"Error scraping {url}: {e}")
         
         return None
     
+    def _fetch_pages_concurrently(self, fetch_page, urls: List[str]) -> List[Dict]:
+        """Run fetch_page over urls in parallel, keeping successful pages in input order"""
+        if not urls:
+            return []
+        pages = list(self.page_executor.map(fetch_page, urls))
+        return [page for page in pages if page]
     
     def _extract_info_from_content(self, content: str, base_url: str, scraped_pages: List[str] = None) -> Dict:
         """Use LLM to extract comprehensive structured information from scraped content"""
-        # Increase content limit for deeper analysis
-        content_to_analyze = content[:6000] if len(content) > 6000 else content
-        
-        prompt = f"""
-        Extract comprehensive information from this company website content (scraped from multiple pages):
-        
-        {content_to_analyze}
-        
-        Extract and return as JSON with the following structure:
-        {{
-            "company_name": "official name of the company",
-            "description": "detailed description of what the company does, their products/services, and value proposition",
-            "website_url": "{base_url}",
-            "email": "contact email if found (PRIORITY: check contact pages, footer, 'Contact Us' sections, 'Get in Touch' sections, header, about page - look for patterns like contact@domain, info@domain, hello@domain, reservations@domain, booking@domain, sales@domain). If not explicitly found, suggest the most likely email based on the domain.",
-            "phone": "phone number if found, otherwise null",
-            "location": "city, country or address if mentioned",
-            "industry": "industry or sector the company operates in",
-            "company_size": "number of employees or size category if mentioned (e.g., '50-100 employees', 'startup', 'enterprise')",
-            "founded_year": "year company was founded if mentioned",
-            "pain_points": ["list", "of", "specific", "pain", "points", "or", "challenges", "they", "might", "face", "based", "on", "their", "industry", "and", "content"],
-            "recent_news": "any recent news, achievements, funding, partnerships, or milestones mentioned",
-            "social_media": {{
-                "linkedin": "LinkedIn URL if found",
-                "twitter": "Twitter/X URL if found",
-                "facebook": "Facebook URL if found"
-            }},
-            "key_features": ["list", "of", "key", "features", "or", "services", "they", "offer"],
-            "target_audience": "who their target customers are"
-        }}
-        
-        CRITICAL EMAIL EXTRACTION INSTRUCTIONS:
-        - Search the ENTIRE content for email addresses, especially in:
-          * Contact pages
-          * Footer sections
-          * "Contact Us" or "Get in Touch" sections
-          * Header/navigation menus
-          * About pages
-        - Look for email patterns matching the domain: {base_url}
-        - For restaurants: look for reservations@, booking@, contact@, info@, hello@
-        - For businesses: look for contact@, info@, sales@, hello@, inquiry@
-        - If no email is found in content, generate the most likely email based on the domain (e.g., contact@domain.com)
-        - NEVER return null for email - always provide a best guess if not found
-        
-        Important:
-        - Always include the website_url field with the base URL: {base_url}
-        - Be thorough in extracting pain_points based on industry and company description
-        - Extract as much detail as possible from the content
-        """
-        
-        messages = [
-            SystemMessage(content="You are an expert at extracting comprehensive structured information from company websites. Analyze the content deeply and extract all available details. Return only valid JSON without any additional text."),
-            HumanMessage(content=prompt)
-        ]
-        
         try:
-            import json
-            response = self.llm.invoke(messages)
-            # Try to extract JSON from response
-            response_content = response.content
-            # Remove markdown code blocks if present
-            if "```json" in response_content:
-                response_content = response_content.split("```json")[1].split("```")[0]
-            elif "```" in response_content:
-                response_content = response_content.split("```")[1].split("```")[0]
-            
-            extracted_info = json.loads(response_content.strip())
-            
-            # Ensure website_url is always set
-            if not extracted_info.get("website_url"):
-                extracted_info["website_url"] = base_url
-            
-            # Try to find email in original content if not found (more aggressive search)
-            if not extracted_info.get("email") or extracted_info.get("email") == "null":
-                # First, try finding in content
-                email = self._find_email_in_content(content, base_url)
-                if email:
-                    extracted_info["email"] = email
-                else:
-                    # Try guessing from URL with multiple patterns
-                    guessed_email = self._guess_email_from_url(base_url, content)
-                    if guessed_email:
-                        extracted_info["email"] = guessed_email
-            
-            # Ensure email is never null - always provide a best guess
-            if not extracted_info.get("email") or extracted_info.get("email") == "null":
-                extracted_info["email"] = self._guess_email_from_url(base_url, content)
-            
-            # Ensure all required fields exist
-            extracted_info.setdefault("source_url", base_url)
-            extracted_info.setdefault("scraped_pages", scraped_pages or [base_url])
-            
-            return extracted_info
+            cache_key = self._extraction_cache_key(content, base_url)
+            cached = self.extraction_cache.get(cache_key) if self.extraction_cache else None
+            if cached is not None:
+                return self._complete_extraction(cached, content, base_url, scraped_pages)
+            response = self.llm.invoke(self._build_extraction_messages(content, base_url))
+            return self._parse_extraction(response.content, content, base_url, scraped_pages, cache_key)
         except Exception as e:
             print(f"LLM extraction error: {e}")
-            # Return comprehensive basic info
-            domain = base_url.split("//")[-1].split("/")[0]
-            return {
-                "company_name": domain.replace("www.", "").split(".")[0].title(),
-                "description": content[:300] if content else "No description available",
-                "website_url": base_url,
-                "email": self._guess_email_from_url(base_url),
-                "phone": None,
-                "location": None,
-                "industry": None,
-                "company_size": None,
-                "founded_year": None,
-                "pain_points": [],
-                "recent_news": None,
-                "social_media": {},
-                "key_features": [],
-                "target_audience": None,
-                "source_url": base_url,
-                "scraped_pages": scraped_pages or [base_url]
-            }
+            return self._fallback_extraction(content, base_url, scraped_pages)
     
-    def _find_email_in_content(self, content: str, url: str) -> Optional[str]:
-        """Try to find email addresses in content, prioritizing business emails"""
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        emails = re.findall(email_pattern, content)
+    def extract_batch(self, items: List[Tuple[str, str, List[str]]]) -> List[Dict]:
+        """
+        Run structured extraction for many sites at once
+        items are (content, base_url, scraped_pages) tuples; requests run concurrently
+        """
+        if not items:
+            return []
         
-        if not emails:
-            return None
+        # Serve repeated sites from the cache and only send the misses to the LLM
+        results: List[Optional[Dict]] = [None] * len(items)
+        cache_keys = [self._extraction_cache_key(content, base_url) for content, base_url, _ in items]
+        pending = []
+        for i, ((content, base_url, scraped_pages), cache_key) in enumerate(zip(items, cache_keys)):
+            cached = self.extraction_cache.get(cache_key) if self.extraction_cache else None
+            if cached is not None:
+                results[i] = self._complete_extraction(cached, content, base_url, scraped_pages)
+            else:
+                pending.append(i)
+        if not pending:
+            return results
         
-        # Extract domain from URL
-        try:
-            from urllib.parse import urlparse
-            parsed = urlparse(url)
-            domain = parsed.netloc.replace("www.", "").lower()
-        except:
-            domain = ""
+        print(f"Extracting {len(pending)} site(s) with LLM in one batch ({len(items) - len(pending)} cached)...")
+        responses = self.llm.batch(
+            [self._build_extraction_messages(items[i][0], items[i][1]) for i in pending],
+            config={"max_concurrency": config.EXTRACTION_CONCURRENCY},
+            return_exceptions=True
+        )
         
-        # Prioritize emails from the same domain
-        same_domain_emails = []
-        other_emails = []
+        def finish(i: int, response) -> Dict:
+            content, base_url, scraped_pages = items[i]
+            try:
+                if isinstance(response, Exception):
+                    raise response
+                return self._parse_extraction(response.content, content, base_url, scraped_pages, cache_keys[i])
+            except Exception as e:
+                print(f"LLM extraction error for {base_url}: {e}")
+                return self._fallback_extraction(content, base_url, scraped_pages)
         
-        for email in emails:
-            email_lower = email.lower()
-            # Skip common generic emails that aren't from the domain
-            if email_lower.endswith(domain) or domain in email_lower:
-                same_domain_emails.append(email)
-            elif not any(skip in email_lower for skip in ["example.com", "test.com", "sample.com", "noreply", "no-reply"]):
-                other_emails.append(email)
-        
-        # Prefer business-related email addresses
-        business_emails = []
-        for email in same_domain_emails + other_emails:
-            email_lower = email.lower()
-            if any(term in email_lower for term in ["contact", "info", "hello", "sales", "business", "inquiry", "enquiry"]):
-                business_emails.append(email)
+        # Filling in missing emails can mean DNS/SMTP checks, so finish the sites in parallel
+        for i, result in zip(pending, self.site_executor.map(finish, pending, responses)):
+            results[i] = result
+        return results
+    
+    def _extraction_cache_key(self, content: str, base_url: str) -> str:
+        """Cache key covering everything that determines the LLM's answer"""
+        return make_cache_key(
+            config.LLM_MODEL, self.llm.temperature, _EXTRACTION_SYSTEM_PROMPT,
+            _prefilter_content(content), base_url
+        )
+    
+    def _build_extraction_messages(self, content: str, base_url: str) -> List:
+        """Build the chat messages for extracting company information from content"""
+        content_to_analyze = _prefilter_content(content)
+        
+        facts = self._extract_structured(content, base_url)
+        facts_line = f"Facts already extracted from the page markup (use as-is): {orjson.dumps(facts).decode()}\n" if facts else ""
+        
+        # Only the per-site parts go in the human message; the instructions are a static prefix
+        prompt = _EXTRACTION_USER_TEMPLATE.format(
+            base_url=base_url, facts_line=facts_line, content=content_to_analyze
+        )
+        return [_EXTRACTION_SYSTEM_MESSAGE, HumanMessage(content=prompt)]
+    
+    def _parse_extraction(self, response_content: str, content: str, base_url: str,
+                          scraped_pages: List[str] = None, cache_key: Optional[str] = None) -> Dict:
+        """Parse the LLM's JSON answer (caching it under cache_key) and fill in missing fields"""
+        # The LLM runs in JSON mode, so the response is a bare JSON object
+        extracted_info = orjson.loads(response_content.strip())
+        if cache_key and self.extraction_cache:
+            self.extraction_cache.set(cache_key, extracted_info)
+        return self._complete_extraction(extracted_info, content, base_url, scraped_pages)
+    
+    def _complete_extraction(self, extracted_info: Dict, content: str, base_url: str, scraped_pages: List[str] = None) -> Dict:
+        """Fill in fields the LLM could not provide"""
+        # Ensure website_url is always set
+        if not extracted_info.get("website_url"):
+            extracted_info["website_url"] = base_url
         
-        # Return priority: business emails from same domain > same domain emails > business emails > other emails
-        if business_emails and any(email.lower().endswith(domain) for email in business_emails if domain):
-            for email in business_emails:
-                if email.lower().endswith(domain):
-                    return email
+        # Values found verbatim in the content beat the LLM's reading of them
+        facts = self._extract_structured(content, base_url)
+        social_media = facts.pop("social_media", None)
+        extracted_info.update(facts)
+        if social_media:
+            if not isinstance(extracted_info.get("social_media"), dict):
+                extracted_info["social_media"] = {}
+            extracted_info["social_media"].update(social_media)
         
-        if business_emails:
-            return business_emails[0]
+        # Try to find email in original content if not found (more aggressive search)
+        if not extracted_info.get("email") or extracted_info.get("email") == "null":
+            # First, try finding in content
+            email = self._find_email_in_content(content, base_url)
+            if email:
+                extracted_info["email"] = email
+            else:
+                # Try guessing from URL with multiple patterns
+                guessed_email = self._guess_email_from_url(base_url, content)
+                if guessed_email:
+                    extracted_info["email"] = guessed_email
         
-        if same_domain_emails:
-            return same_domain_emails[0]
+        # Ensure all required fields exist
+        extracted_info.setdefault("source_url", base_url)
+        extracted_info.setdefault("scraped_pages", scraped_pages or [base_url])
         
-        return other_emails[0] if other_emails else None
+        return extracted_info
     
-    def _guess_email_from_url(self, url: str, content: str = "") -> Optional[str]:
-        """Guess common email patterns from URL, with context-aware suggestions"""
-        try:
-            domain = url.split("//")[-1].split("/")[0]
-            if domain.startswith("www."):
-                domain = domain[4:]
+    def _extract_structured(self, content: str, base_url: str) -> Dict:
+        """Deterministically extract email, phone, founding year and social profiles"""
+        facts = {}
+        email = self._find_email_in_content(content, base_url)
+        if email:
+            facts["email"] = email
+        for match in _PHONE_RE.finditer(content):
+            digits = sum(char.isdigit() for char in match.group())
+            if 9 <= digits <= 15:  # Skip dates, prices and other number runs
+                facts["phone"] = match.group().strip()
+                break
+        founded = _FOUNDED_RE.search(content)
+        if founded:
+            facts["founded_year"] = founded.group(1)
+        social_media = {}
+        for match in _SOCIAL_URL_RE.finditer(content):
+            platform = _SOCIAL_PLATFORMS[match.group(1).split("/")[0].lower() + "/"]
+            social_media.setdefault(platform, match.group().rstrip(".,;"))
+        if social_media:
+            facts["social_media"] = social_media
+        return facts
+    
+    def _fallback_extraction(self, content: str, base_url: str, scraped_pages: List[str] = None) -> Dict:
+        """Return comprehensive basic info when the LLM extraction fails"""
+        facts = self._extract_structured(content, base_url) if content else {}
+        return {
+            "company_name": _split_domain(base_url).split(".")[0].title(),
+            "description": content[:300] if content else "No description available",
+            "website_url": base_url,
+            "email": facts.get("email") or self._guess_email_from_url(base_url),
+            "phone": facts.get("phone"),
+            "location": None,
+            "industry": None,
+            "company_size": None,
+            "founded_year": facts.get("founded_year"),
+            "pain_points": [],
+            "recent_news": None,
+            "social_media": facts.get("social_media", {}),
+            "key_features": [],
+            "target_audience": None,
+            "source_url": base_url,
+            "scraped_pages": scraped_pages or [base_url]
+        }
+    
+    def _find_email_in_content(self, content: str, url: str) -> Optional[str]:
+        """Try to find email addresses in content, prioritizing business emails"""
+        # Extract domain from URL
+        domain = _split_domain(url).lower()
+        
+        # Single pass over the distinct matches, keeping the best-scoring one:
+        # business address > any address, then the site's own domain > elsewhere.
+        # A business address ending in the site's domain can't be beaten, so stop there
+        seen = set()
+        best_email = None
+        best_score = -1
+        
+        for match in _EMAIL_RE.finditer(content):
+            email = match.group(0)
+            email_lower = email.lower()
+            if email_lower in seen:
+                continue
+            seen.add(email_lower)
+            # Skip asset names that look like emails (e.g. logo@2x.png)
+            if _ASSET_EMAIL_RE.search(email_lower):
+                continue
             
-            content_lower = content.lower() if content else ""
+            is_same_domain = domain in email_lower
+            # Skip common generic emails that aren't from the domain
+            if not is_same_domain and _PLACEHOLDER_EMAIL_RE.search(email_lower):
+                continue
             
-            # Context-aware email patterns based on content
-            if any(term in content_lower for term in ["restaurant", "dining", "food", "menu", "reservation", "booking"]):
-                # Restaurant-specific patterns
-                restaurant_emails = [
-                    f"contact@{domain}",
-                    f"info@{domain}",
-                    f"reservations@{domain}",
-                    f"booking@{domain}",
-                    f"hello@{domain}",
-                    f"inquiry@{domain}"
-                ]
-                return restaurant_emails[0]
-            elif any(term in content_lower for term in ["hotel", "accommodation", "stay", "room"]):
-                # Hotel-specific patterns
-                hotel_emails = [
-                    f"contact@{domain}",
-                    f"info@{domain}",
-                    f"reservations@{domain}",
-                    f"booking@{domain}",
-                    f"hello@{domain}"
-                ]
-                return hotel_emails[0]
-            else:
-                # General business patterns
-                common_emails = [
-                    f"contact@{domain}",
-                    f"info@{domain}",
-                    f"hello@{domain}",
-                    f"sales@{domain}",
-                    f"inquiry@{domain}"
-                ]
-                return common_emails[0]
-        except:
+            is_business = _BUSINESS_EMAIL_RE.search(email_lower) is not None
+            if is_business and email_lower.endswith(domain):
+                return email
+            
+            score = 2 * is_business + is_same_domain
+            if score > best_score:
+                best_email, best_score = email, score
+        
+        return best_email
+    
+    def _guess_email_from_url(self, url: str, content: str = "") -> Optional[str]:
+        """
+        Guess common email patterns from URL, with context-aware suggestions
+        With EMAIL_VERIFY_ENABLED, candidates are checked against the domain's mail server
+        and a guess the server definitely rejects is not returned
+        """
+        domain = _split_domain(url)
+        if not domain:
             return None
+        
+        if not (config.EMAIL_VERIFY_ENABLED and DNSPYTHON_AVAILABLE):
+            # Every pattern list starts with contact@, so no need to classify the content
+            return _build_email_candidates(domain, "general")[0]
+        
+        # Context-aware email patterns based on content
+        candidates = _build_email_candidates(domain, _classify_content(content))
+        
+        status, verified_email = _verify_email_candidates(domain, candidates)
+        if status == "verified":
+            return verified_email
+        if status == "rejected":
+            return None
+        # Inconclusive (no port 25, catch-all server, timeouts): keep the pattern guess
+        return candidates[0]
 
 
 class LeadValidatorAgent:
@@ -741,58 +1421,254 @@ class LeadValidatorAgent:
     def __init__(self):
         if not config.OPENAI_API_KEY:
             raise ValueError("OPENAI_API_KEY not set in config")
+        # Validation is a one-word answer: use the fast model and cap generation
         self.llm = ChatOpenAI(
-            model=config.LLM_MODEL,
-            temperature=0.3,
+            model=config.LLM_MODEL_FAST,
+            temperature=0,
+            max_tokens=4,
             api_key=config.OPENAI_API_KEY
         )
+        # Packed prompts answer many leads at once as JSON
+        self.batch_llm = ChatOpenAI(
+            model=config.LLM_MODEL_FAST,
+            temperature=0,
+            api_key=config.OPENAI_API_KEY,
+            max_retries=3,
+            model_kwargs={"response_format": {"type": "json_object"}}
+        )
+        # LLM verdicts per (query, company): a company found again for the same query
+        # is not re-validated
+        self.verdict_cache = (
+            TTLCache("validation", ttl_seconds=config.LLM_CACHE_TTL_DAYS * 86400)
+            if config.LLM_CACHE_ENABLED else None
+        )
     
     def validate_lead(self, lead_info: Dict, original_query: str) -> bool:
         """Determine if a lead matches the original search criteria"""
-        # Extract key information for validation
-        company_name = lead_info.get("company_name", "").lower()
-        description = str(lead_info.get("description", "")).lower()
-        website_url = lead_info.get("website_url", "").lower()
+        prefiltered = self._prefilter_lead(lead_info, original_query)
+        if prefiltered is not None:
+            return prefiltered
+        cached = self._cached_verdict(lead_info, original_query)
+        if cached is not None:
+            return cached
         
-        # If we don't have enough info, default to valid
-        if not company_name and not description:
+        company_name = lead_info.get("company_name", "")
+        try:
+            response = self.llm.invoke(self._build_validation_messages(lead_info, original_query))
+        except Exception as e:
+            print(f"Validation error for {company_name}: {e}")
+            # Default to valid if validation fails - better to include than exclude
             return True
+        is_valid = self._parse_validation_answer(response.content, company_name)
+        self._store_verdict(lead_info, original_query, is_valid)
+        return is_valid
+    
+    def validate_batch(self, leads: List[Dict], original_query: str) -> List[bool]:
+        """
+        Validate many leads at once
+        Ambiguous leads are packed VALIDATION_BATCH_SIZE to a prompt, so N leads cost
+        about N / VALIDATION_BATCH_SIZE LLM round-trips
+        """
+        results: List[Optional[bool]] = []
+        for lead in leads:
+            result = self._prefilter_lead(lead, original_query)
+            if result is None:
+                result = self._cached_verdict(lead, original_query)
+            results.append(result)
+        pending = [i for i, result in enumerate(results) if result is None]
+        if not pending:
+            return results
         
-        prompt = f"""
-        Original search query: "{original_query}"
+        size = max(1, config.VALIDATION_BATCH_SIZE)
+        chunks = [pending[start:start + size] for start in range(0, len(pending), size)]
+        print(f"Validating {len(pending)} leads with LLM in {len(chunks)} prompt(s)...")
+        responses = self.batch_llm.batch(
+            [self._build_batch_validation_messages([leads[i] for i in chunk], original_query) for chunk in chunks],
+            config={"max_concurrency": 8},
+            return_exceptions=True
+        )
+        for chunk, response in zip(chunks, responses):
+            answers = None
+            if isinstance(response, Exception):
+                print(f"Batch validation error: {response}")
+            else:
+                answers = self._parse_batch_validation_answers(response.content, len(chunk))
+            for position, i in enumerate(chunk):
+                if answers is None:
+                    # Default to valid if validation fails - better to include than exclude
+                    results[i] = True
+                else:
+                    results[i] = self._parse_validation_answer(answers[position], leads[i].get("company_name", ""))
+                    self._store_verdict(leads[i], original_query, results[i])
+        return results
+    
+    def _verdict_key(self, lead_info: Dict, original_query: str) -> str:
+        """Cache key for an LLM verdict: model, query and company name"""
+        return make_cache_key(config.LLM_MODEL_FAST, original_query, lead_info.get("company_name", ""))
+    
+    def _cached_verdict(self, lead_info: Dict, original_query: str) -> Optional[bool]:
+        """Verdict from an earlier LLM validation of the same company for the same query"""
+        if self.verdict_cache is None or not lead_info.get("company_name"):
+            return None
+        return self.verdict_cache.get(self._verdict_key(lead_info, original_query))
+    
+    def _store_verdict(self, lead_info: Dict, original_query: str, is_valid: bool):
+        """Remember an LLM verdict (fallback answers after errors are not stored)"""
+        if self.verdict_cache is not None and lead_info.get("company_name"):
+            self.verdict_cache.set(self._verdict_key(lead_info, original_query), is_valid)
+    
+    def _prefilter_lead(self, lead_info: Dict, original_query: str) -> Optional[bool]:
+        """Cheap keyword check; returns None when the LLM has to decide"""
+        company_name = lead_info.get("company_name", "")
+        description = lead_info.get("description", "")
         
-        Lead information:
-        - Company: {company_name}
-        - Description: {description[:200]}
-        - Website: {website_url}
+        # If we don't have enough info, default to valid
+        if not company_name and not description:
+            return True
         
-        Task: Determine if this lead is RELEVANT to the search query. 
+        # Clear matches and clear misses skip the LLM call (_tokenize lowercases)
+        query_tokens = _query_tokens(original_query)
+        lead_tokens = _tokenize(f"{company_name} {description}")
+        if query_tokens and lead_tokens:
+            shared = len(query_tokens & lead_tokens)
+            if shared >= 2 or shared / len(query_tokens) >= 0.4:
+                return True
+            # A bare company name with no overlap is too little to reject on
+            if shared == 0 and description:
+                print(f"Validation rejected: {company_name} - no keyword overlap with query")
+                return False
+        return None
+    
+    def _build_validation_messages(self, lead_info: Dict, original_query: str) -> List:
+        """Build the yes/no validation prompt for a single lead"""
+        prompt = _VALIDATION_USER_TEMPLATE.format(
+            query=original_query,
+            company_name=lead_info.get("company_name", ""),
+            description=str(lead_info.get("description", ""))[:200],
+            website_url=lead_info.get("website_url", "")
+        )
+        return [_VALIDATION_SYSTEM_MESSAGE, HumanMessage(content=prompt)]
+    
+    def _build_batch_validation_messages(self, leads: List[Dict], original_query: str) -> List:
+        """Build one prompt that lists several leads, numbered from 1"""
+        lines = [
+            _BATCH_VALIDATION_LEAD_TEMPLATE.format(
+                number=number,
+                company_name=lead.get("company_name", ""),
+                description=str(lead.get("description", ""))[:200],
+                website_url=lead.get("website_url", "")
+            )
+            for number, lead in enumerate(leads, 1)
+        ]
+        prompt = f'Original search query: "{original_query}"\n\nLeads:\n' + "\n".join(lines)
+        return [_BATCH_VALIDATION_SYSTEM_MESSAGE, HumanMessage(content=prompt)]
+    
+    def _parse_batch_validation_answers(self, response_content: str, expected: int) -> Optional[List[str]]:
+        """Read the answers list from a packed reply; None if it doesn't line up with the leads"""
+        try:
+            answers = orjson.loads(response_content).get("answers")
+        except (orjson.JSONDecodeError, AttributeError):
+            return None
+        if not isinstance(answers, list) or len(answers) != expected:
+            print(f"Batch validation returned {len(answers) if isinstance(answers, list) else 'no'} answers for {expected} leads")
+            return None
+        # JSON mode may answer a yes/no list with booleans; str(True) would read as a rejection
+        return ["yes" if answer is True else "no" if answer is False else str(answer) for answer in answers]
+    
+    def _parse_validation_answer(self, response_content: str, company_name: str) -> bool:
+        """Turn the LLM's yes/no reply into a bool"""
+        answer = response_content.lower().strip()
+        is_valid = "yes" in answer or answer.startswith("y")
         
-        Guidelines:
-        - If searching for restaurants, accept restaurant review sites, food blogs, and dining guides as they are relevant
-        - If searching for businesses, accept business directories, review sites, and related services
-        - Be lenient - if there's any connection to the query, accept it
-        - Only reject if completely unrelated (e.g., a restaurant site when searching for software companies)
+        if not is_valid:
+            print(f"Validation rejected: {company_name} - LLM response: {answer}")
         
-        Answer only 'yes' or 'no'.
+        return is_valid
+
+
+class LeadPipeline:
+    """
+    Enrich -> validate pipeline for a batch of leads
+    Sites are scraped concurrently and their extractions sent to the LLM together,
+    then every enriched lead is validated in one packed round of LLM calls
+    """
+    
+    def __init__(self, enrichment_agent: LeadEnrichmentAgent,
+                 validator_agent: Optional[LeadValidatorAgent] = None,
+                 find_known_emails: Optional[Callable[[List[str]], set]] = None):
+        self.enrichment_agent = enrichment_agent
+        self.validator_agent = validator_agent
+        # Bulk duplicate check, e.g. one query against the leads table; returns the known subset
+        self.find_known_emails = find_known_emails
+    
+    def run(self, urls: List[str], query: str) -> List[Dict]:
+        """
+        Process many website URLs concurrently
+        Returns one state dict per input URL, in order; skipped leads carry a skip_reason
         """
+        if not urls:
+            return []
+        # scrape_websites runs on the enrichment agent's site pool, so concurrent
+        # discovery requests together stay within ENRICH_CONCURRENCY
+        try:
+            scraped = self.enrichment_agent.scrape_websites(urls)
+        except Exception as e:
+            return [{"url": url, "query": query, "skip_reason": f"Pipeline error: {e}"} for url in urls]
         
-        messages = [
-            SystemMessage(content="You are a lead validation expert. Be lenient and accept leads that are even loosely related to the search query. Answer only 'yes' or 'no'."),
-            HumanMessage(content=prompt)
+        # Emails already taken by another lead in this run, so duplicates skip validation
+        claimed_emails = set()
+        states = [
+            self._enrich({"url": url, "query": query}, company_data, claimed_emails)
+            for url, company_data in zip(urls, scraped)
         ]
+        return self._validate(self._skip_known(states), query)
+    
+    def _enrich(self, state: Dict, company_data: Optional[Dict], claimed_emails: set) -> Dict:
+        """Attach one website's extracted data, then resolve and dedupe its email"""
+        url = state["url"]
+        if not url:
+            return {**state, "skip_reason": "No URL"}
+        if not company_data:
+            return {**state, "skip_reason": "No company data extracted"}
+        
+        # A missing email means verification already rejected every guess for this site
+        email = company_data.get("email")
+        if not email:
+            return {**state, "skip_reason": "No email found"}
+        
+        if email in claimed_emails:
+            return {**state, "email": email, "skip_reason": "Duplicate"}
+        claimed_emails.add(email)
         
+        return {**state, "company_data": company_data, "email": email}
+    
+    def _skip_known(self, states: List[Dict]) -> List[Dict]:
+        """Mark enriched leads whose email is already stored as duplicates, with one lookup"""
+        if not self.find_known_emails:
+            return states
+        emails = [state["email"] for state in states if not state.get("skip_reason")]
+        known = self.find_known_emails(emails) if emails else set()
+        return [
+            {**state, "skip_reason": "Duplicate"}
+            if not state.get("skip_reason") and state["email"] in known else state
+            for state in states
+        ]
+    
+    def _validate(self, states: List[Dict], query: str) -> List[Dict]:
+        """Validate all enriched leads against the query (skipped leads pass through)"""
+        if not self.validator_agent:
+            return states
+        to_validate = [
+            i for i, state in enumerate(states)
+            if not state.get("skip_reason") and state["company_data"].get("company_name")
+        ]
+        if not to_validate:
+            return states
         try:
-            response = self.llm.invoke(messages)
-            answer = response.content.lower().strip()
-            is_valid = "yes" in answer or answer.startswith("y")
-            
-            if not is_valid:
-                print(f"Validation rejected: {company_name} - LLM response: {answer}")
-            
-            return is_valid
+            verdicts = self.validator_agent.validate_batch([states[i]["company_data"] for i in to_validate], query)
         except Exception as e:
-            print(f"Validation error for {company_name}: {e}")
-            # Default to valid if validation fails - better to include than exclude
-            return True
-
+            print(f"⚠️  Validation error: {e}, accepting leads anyway")
+            verdicts = [True] * len(to_validate)
+        for i, is_valid in zip(to_validate, verdicts):
+            states[i] = {**states[i], "is_valid": is_valid}
+        return states
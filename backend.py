@@ -2,26 +2,99 @@
 FastAPI Backend for Lead Generation System
 All business logic remains the same, only UI changed
 """
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Query
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.responses import HTMLResponse, FileResponse, ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, EmailStr
-from typing import List, Dict, Optional
+from fastapi.middleware.gzip import GZipMiddleware
+from pydantic import BaseModel
+from typing import List, Optional
 import uvicorn
-from datetime import datetime
+from datetime import datetime, timedelta
+from itertools import accumulate
+import os
+import threading
 import uuid
 
 # Import all existing modules (logic remains the same)
-from database import Database
-from agents import LeadDiscoveryAgent, LeadEnrichmentAgent, LeadValidatorAgent
+from database import get_database
+from agents import LeadDiscoveryAgent, LeadEnrichmentAgent, LeadValidatorAgent, LeadPipeline
 from email_generator import AICopywriter
 from email_sender import EmailSender
-from scheduler import get_scheduler
+from scheduler import get_scheduler, acquire_scheduler_lock
 import config
 
+
+# Initialize components
+db = get_database()
+discovery_agent = None
+enrichment_agent = None
+validator_agent = None
+copywriter = None
+email_sender = EmailSender(db=db)
+scheduler = get_scheduler()
+
+
+def init_agents():
+    """Initialize agents on startup"""
+    import traceback
+    global discovery_agent, enrichment_agent, validator_agent, copywriter
+    try:
+        if config.OPENAI_API_KEY:
+            print("Initializing AI agents...")
+            discovery_agent = LeadDiscoveryAgent()
+            print("✅ Discovery agent initialized")
+            enrichment_agent = LeadEnrichmentAgent()
+            print("✅ Enrichment agent initialized")
+            validator_agent = LeadValidatorAgent()
+            print("✅ Validator agent initialized")
+            copywriter = AICopywriter()
+            print("✅ Copywriter initialized")
+        else:
+            print("⚠️ WARNING: OPENAI_API_KEY not set. Agents will not be initialized.")
+    except Exception:
+        error_trace = traceback.format_exc()
+        print(f"❌ ERROR: Agents not initialized: {error_trace}")
+        discovery_agent = None
+        enrichment_agent = None
+        validator_agent = None
+        copywriter = None
+
+
+def start_scheduler():
+    """Start the follow-up scheduler, in at most one process"""
+    if not config.SCHEDULER_ENABLED:
+        print("⏭️ Follow-up scheduler disabled (SCHEDULER_ENABLED=false)")
+        return
+    if not acquire_scheduler_lock():
+        print("⏭️ Follow-up scheduler already running in another worker")
+        return
+    try:
+        scheduler.start(check_interval_minutes=15)  # Check every 15 minutes for better responsiveness
+    except Exception as e:
+        print(f"⚠️ Warning: Could not start follow-up scheduler: {e}")
+        print("Follow-up emails will not be sent automatically. You can still send them manually.")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start agents and the scheduler with the server; stop them and close SMTP connections on shutdown"""
+    init_agents()
+    start_scheduler()
+    yield
+    if scheduler.running:
+        scheduler.stop()
+    email_sender.close()
+
+
 # Initialize FastAPI app
-app = FastAPI(title="Agentic Lead Generation System")
+app = FastAPI(
+    title="Agentic Lead Generation System",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse  # orjson for every JSON response
+)
 
 # CORS middleware
 app.add_middleware(
@@ -32,26 +105,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress JSON responses (lead lists carry the full scraped company data)
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # Static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-# Initialize components
-db = Database()
-discovery_agent = None
-enrichment_agent = None
-validator_agent = None
-copywriter = None
-email_sender = EmailSender()
-scheduler = get_scheduler()
-
-# Start scheduler
-try:
-    scheduler.start(check_interval_minutes=15)  # Check every 15 minutes for better responsiveness
-    print("✅ Follow-up scheduler started successfully - checking every 15 minutes")
-except Exception as e:
-    print(f"⚠️ Warning: Could not start follow-up scheduler: {e}")
-    print("Follow-up emails will not be sent automatically. You can still send them manually.")
-
 
 # Pydantic models for API requests/responses
 class LeadSearchRequest(BaseModel):
@@ -88,33 +147,6 @@ class CampaignCreateRequest(BaseModel):
     notes: Optional[str] = None
 
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize agents on startup"""
-    import traceback
-    global discovery_agent, enrichment_agent, validator_agent, copywriter
-    try:
-        if config.OPENAI_API_KEY:
-            print("Initializing AI agents...")
-            discovery_agent = LeadDiscoveryAgent()
-            print("✅ Discovery agent initialized")
-            enrichment_agent = LeadEnrichmentAgent()
-            print("✅ Enrichment agent initialized")
-            validator_agent = LeadValidatorAgent()
-            print("✅ Validator agent initialized")
-            copywriter = AICopywriter()
-            print("✅ Copywriter initialized")
-        else:
-            print("⚠️ WARNING: OPENAI_API_KEY not set. Agents will not be initialized.")
-    except Exception as e:
-        error_trace = traceback.format_exc()
-        print(f"❌ ERROR: Agents not initialized: {error_trace}")
-        discovery_agent = None
-        enrichment_agent = None
-        validator_agent = None
-        copywriter = None
-
-
 # API Routes
 
 @app.get("/")
@@ -142,12 +174,12 @@ async def get_config():
         "openai_key": bool(config.OPENAI_API_KEY),
         "serpapi_key": bool(config.SERPAPI_API_KEY),
         "tavily_key": bool(config.TAVILY_API_KEY),
-        "smtp_configured": bool(config.SMTP_USERNAME and config.SMTP_PASSWORD),
+        "smtp_configured": config.SMTP_CONFIGURED,
         "agents_initialized": bool(discovery_agent and enrichment_agent)
     }
 
 @app.get("/health")
-async def health_check():
+def health_check():
     """Health check endpoint for deployment platforms"""
     try:
         # Test database connection
@@ -166,7 +198,7 @@ async def health_check():
 
 
 @app.post("/api/leads/discover")
-async def discover_leads(request: LeadSearchRequest, background_tasks: BackgroundTasks):
+def discover_leads(request: LeadSearchRequest):
     """Discover and enrich leads"""
     import traceback
     
@@ -220,75 +252,71 @@ async def discover_leads(request: LeadSearchRequest, background_tasks: Backgroun
             }
         
         leads = []
+        pipeline = LeadPipeline(
+            enrichment_agent,
+            validator_agent,
+            find_known_emails=db.get_existing_emails
+        )
         
-        for idx, result in enumerate(search_results[:request.max_leads]):
-            try:
-                website_url = result.get("url", "")
-                if not website_url:
-                    print(f"Skipping result {idx}: No URL")
-                    continue
-                
-                print(f"Processing {idx+1}/{min(len(search_results), request.max_leads)}: {website_url}")
-                company_data = enrichment_agent.scrape_website(website_url)
-                if not company_data:
-                    print(f"Skipping {website_url}: No company data extracted")
-                    continue
-                
-                email = company_data.get("email")
-                if not email:
-                    email = enrichment_agent._guess_email_from_url(website_url)
-                
-                if not email:
-                    print(f"Skipping {website_url}: No email found")
+        # Scrape candidates concurrently, extract them in one LLM batch, then validate together
+        # Search over-fetches, so when some sites yield nothing the spare results top up the shortfall
+        accepted = []
+        accepted_emails = set()
+        offset = 0
+        while len(accepted) < request.max_leads and offset < len(search_results):
+            wave_size = request.max_leads - len(accepted)
+            candidates = search_results[offset:offset + wave_size]
+            print(f"Enriching {len(candidates)} candidate websites...")
+            states = pipeline.run([result.get("url", "") for result in candidates], request.query)
+            
+            for idx, (result, state) in enumerate(zip(candidates, states), start=offset):
+                website_url = state["url"]
+                if not state.get("skip_reason") and state["email"] in accepted_emails:
+                    state = {**state, "skip_reason": "Duplicate"}
+                if state.get("skip_reason"):
+                    print(f"Skipping {state.get('email') or website_url or f'result {idx}'}: {state['skip_reason']}")
                     continue
                 
-                # Check for duplicates
-                existing = db.get_lead_by_email(email)
-                if existing:
-                    print(f"Skipping {email}: Duplicate")
-                    continue
-                
-                # Validate lead (optional - be lenient)
-                if validator_agent and company_data.get("company_name"):
-                    try:
-                        is_valid = validator_agent.validate_lead(company_data, request.query)
-                        if not is_valid:
-                            print(f"⚠️  Validation rejected {email} ({company_data.get('company_name', 'Unknown')}) - but this might be too strict")
-                            # For now, let's be lenient and accept it anyway if it has an email
-                            # Uncomment the next line to enable strict validation:
-                            # continue
-                    except Exception as e:
-                        print(f"⚠️  Validation error for {email}: {e}, accepting lead anyway")
-                        # Continue with lead if validation fails
-                
-                # Add to database
-                lead = db.add_lead(
-                    email=email,
-                    name=company_data.get("name", email.split("@")[0].replace(".", " ").title()),
-                    company_name=company_data.get("company_name", result.get("title", "Unknown Company")),
-                    company_data=company_data,
-                    campaign_id=campaign_id
-                )
-                
-                leads.append({
-                    "id": lead.id,
+                email = state["email"]
+                company_data = state["company_data"]
+                if state.get("is_valid") is False:
+                    print(f"⚠️  Validation rejected {email} ({company_data.get('company_name', 'Unknown')}) - but this might be too strict")
+                    # For now, let's be lenient and accept it anyway if it has an email
+                    # Add `continue` here to enable strict validation
+                accepted.append((idx, result, company_data, email, website_url))
+                accepted_emails.add(email)
+            offset += len(candidates)
+        
+        # Add to database in one transaction
+        try:
+            added = db.add_leads([
+                {
                     "email": email,
-                    "name": lead.name,
-                    "company_name": lead.company_name,
-                    "description": company_data.get("description", "")[:100] + "...",
-                    "pain_points": ", ".join(company_data.get("pain_points", [])[:3]),
-                    "status": "found",
+                    "name": company_data.get("name", email.split("@")[0].replace(".", " ").title()),
+                    "company_name": company_data.get("company_name", result.get("title", "Unknown Company")),
                     "company_data": company_data,
-                    "campaign_id": campaign_id,
-                    "website_url": company_data.get("website_url") or company_data.get("source_url") or website_url
-                })
-                print(f"Added lead: {email}")
-            except Exception as e:
-                print(f"Error processing lead {idx}: {traceback.format_exc()}")
-                continue
+                    "campaign_id": campaign_id
+                }
+                for idx, result, company_data, email, website_url in accepted
+            ])
+        except Exception:
+            print(f"Error adding leads: {traceback.format_exc()}")
+            added = []
         
-        # Update campaign lead count
-        background_tasks.add_task(db.update_campaign_lead_count, campaign_id)
+        for (idx, result, company_data, email, website_url), lead in zip(accepted, added):
+            leads.append({
+                "id": lead.id,
+                "email": email,
+                "name": lead.name,
+                "company_name": lead.company_name,
+                "description": company_data.get("description", "")[:100] + "...",
+                "pain_points": ", ".join(company_data.get("pain_points", [])[:3]),
+                "status": "found",
+                "company_data": company_data,
+                "campaign_id": campaign_id,
+                "website_url": company_data.get("website_url") or company_data.get("source_url") or website_url
+            })
+            print(f"Added lead: {email}")
         
         print(f"Discovery complete: {len(leads)} leads added")
         return {
@@ -306,7 +334,7 @@ async def discover_leads(request: LeadSearchRequest, background_tasks: Backgroun
 
 
 @app.post("/api/email/generate")
-async def generate_email(request: EmailGenerateRequest):
+def generate_email(request: EmailGenerateRequest):
     """Generate email for a lead"""
     if not copywriter:
         raise HTTPException(status_code=500, detail="Email generator not initialized")
@@ -327,12 +355,12 @@ async def generate_email(request: EmailGenerateRequest):
 
 
 @app.post("/api/email/send")
-async def send_email(request: EmailSendRequest):
+def send_email(request: EmailSendRequest):
     """Send email to a lead"""
     import traceback
     try:
         # Validate SMTP configuration
-        if not config.SMTP_USERNAME or not config.SMTP_PASSWORD:
+        if not config.SMTP_CONFIGURED:
             raise HTTPException(
                 status_code=400, 
                 detail="❌ SMTP credentials not configured. Please set SMTP_USERNAME and SMTP_PASSWORD in your environment variables."
@@ -347,7 +375,7 @@ async def send_email(request: EmailSendRequest):
         
         print(f"Attempting to send email to {request.lead_email}")
         print(f"SMTP Server: {config.SMTP_SERVER}:{config.SMTP_PORT}")
-        print(f"From: {config.EMAIL_FROM or config.SMTP_USERNAME}")
+        print(f"From: {config.SMTP_SENDER}")
         
         result = email_sender.send_lead_email(
             request.lead_email,
@@ -373,24 +401,19 @@ async def send_email(request: EmailSendRequest):
 
 
 @app.post("/api/email/bulk")
-async def send_bulk_emails(request: BulkEmailRequest, background_tasks: BackgroundTasks):
+def send_bulk_emails(request: BulkEmailRequest, background_tasks: BackgroundTasks):
     """Send bulk emails"""
     if not copywriter:
         raise HTTPException(status_code=500, detail="Email generator not initialized")
     
-    # Get leads
-    all_leads = db.get_all_leads(limit=1000)
-    
-    # Apply filters
-    filtered_leads = all_leads
-    if request.status_filter:
-        filtered_leads = [l for l in filtered_leads if l.status in request.status_filter]
-    if request.exclude_replied:
-        filtered_leads = [l for l in filtered_leads if not l.has_replied]
-    if request.campaign_id:
-        filtered_leads = [l for l in filtered_leads if l.campaign_id == request.campaign_id]
-    if request.lead_ids:
-        filtered_leads = [l for l in filtered_leads if l.id in request.lead_ids]
+    # Get leads, filtered in SQL
+    filtered_leads = db.get_leads(
+        campaign_id=request.campaign_id,
+        statuses=request.status_filter,
+        exclude_replied=request.exclude_replied,
+        lead_ids=request.lead_ids,
+        limit=1000
+    )
     
     results = {
         "total": len(filtered_leads),
@@ -399,35 +422,62 @@ async def send_bulk_emails(request: BulkEmailRequest, background_tasks: Backgrou
         "details": []
     }
     
-    # Send emails in background
-    def send_bulk():
-        for lead in filtered_leads:
-            try:
-                email_result = copywriter.generate_email(lead.to_dict(), request.user_context)
-                email_content = email_result.get("body", "")
-                email_subject = email_result.get("subject", "")
-                
-                if not email_subject or email_subject == "Error":
-                    email_subject = request.subject_template.format(
-                        company_name=lead.company_name,
-                        name=lead.name or ""
+    results_lock = threading.Lock()
+    
+    def record(lead, status: str, message: str):
+        """Add one send outcome to the shared results (workers report concurrently)"""
+        with results_lock:
+            results["success" if status == "success" else "failed"] += 1
+            results["details"].append({
+                "email": lead.email,
+                "status": status,
+                "message": message
+            })
+    
+    def send_shard(shard):
+        """Generate and send emails for one worker's share of the leads"""
+        # Generate a batch of emails concurrently, then send them before starting the next batch
+        # Each worker keeps its own SMTP login for its whole share
+        batch_size = max(1, config.EMAIL_GENERATION_BATCH_SIZE)
+        with email_sender.session() as smtp:
+            for start in range(0, len(shard), batch_size):
+                batch = shard[start:start + batch_size]
+                try:
+                    email_results = copywriter.generate_emails_batch(
+                        [lead.to_dict() for lead in batch], request.user_context
                     )
+                except Exception as e:
+                    for lead in batch:
+                        record(lead, "failed", str(e))
+                    continue
                 
-                result = email_sender.send_lead_email(lead.email, email_content, email_subject)
-                results["success"] += 1 if result["success"] else 0
-                results["failed"] += 0 if result["success"] else 1
-                results["details"].append({
-                    "email": lead.email,
-                    "status": "success" if result["success"] else "failed",
-                    "message": result.get("message", "")
-                })
-            except Exception as e:
-                results["failed"] += 1
-                results["details"].append({
-                    "email": lead.email,
-                    "status": "failed",
-                    "message": str(e)
-                })
+                # Send the batch, then mark all its delivered leads as emailed in one update
+                try:
+                    outgoing = []
+                    for lead, email_result in zip(batch, email_results):
+                        email_subject = email_result.get("subject", "")
+                        if not email_subject or email_subject == "Error":
+                            email_subject = request.subject_template.format(
+                                company_name=lead.company_name,
+                                name=lead.name or ""
+                            )
+                        outgoing.append((lead.email, email_subject, email_result.get("body", "")))
+                    send_results = email_sender.send_campaign(outgoing, smtp=smtp)
+                except Exception as e:
+                    for lead in batch:
+                        record(lead, "failed", str(e))
+                    continue
+                for lead, result in zip(batch, send_results):
+                    record(lead, "success" if result["success"] else "failed", result.get("message", ""))
+    
+    # Send emails in background, spread over a few SMTP connections
+    def send_bulk():
+        workers = max(1, min(config.BULK_SEND_WORKERS, len(filtered_leads)))
+        shards = [filtered_leads[i::workers] for i in range(workers)]
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bulk-send") as pool:
+            list(pool.map(send_shard, shards))
+        print(f"📧 Bulk email finished: {results['success']} sent, {results['failed']} failed "
+              f"of {results['total']}")
     
     background_tasks.add_task(send_bulk)
     
@@ -439,48 +489,28 @@ async def send_bulk_emails(request: BulkEmailRequest, background_tasks: Backgrou
 
 
 @app.get("/api/leads")
-async def get_leads(campaign_id: Optional[str] = None, status: Optional[str] = None, limit: int = 1000):
-    """Get all leads with optional filters"""
-    leads = db.get_all_leads(limit=limit)
-    
-    if campaign_id:
-        leads = [l for l in leads if l.campaign_id == campaign_id]
-    if status and status != "All":
-        leads = [l for l in leads if l.status == status]
-    
-    # Convert leads to dicts with error handling
-    leads_dict = []
-    for lead in leads:
-        try:
-            leads_dict.append(lead.to_dict())
-        except Exception as e:
-            print(f"Error converting lead {lead.id} to dict: {e}")
-            # Return basic info even if to_dict fails
-            leads_dict.append({
-                "id": lead.id,
-                "email": lead.email or "",
-                "name": lead.name or "",
-                "company_name": lead.company_name or "",
-                "company_data": {},
-                "campaign_id": lead.campaign_id or "",
-                "status": lead.status or "found",
-                "email_content": lead.email_content or "",
-                "follow_up_date": None,
-                "created_at": lead.created_at.isoformat() if lead.created_at else None,
-                "last_contacted_at": lead.last_contacted_at.isoformat() if lead.last_contacted_at else None,
-                "sent_email_at": lead.sent_email_at.isoformat() if lead.sent_email_at else None,
-                "has_replied": lead.has_replied or False,
-            })
+def get_leads(campaign_id: Optional[str] = None, status: Optional[str] = None, limit: int = 1000,
+              lead_ids: Optional[List[int]] = Query(None)):
+    """Get all leads with optional filters (repeat lead_ids to fetch specific leads)"""
+    leads = db.get_leads(
+        campaign_id=campaign_id,
+        status=status if status != "All" else None,
+        lead_ids=lead_ids,
+        limit=limit
+    )
     
-    return {
+    # Lead.to_dict() defines the response shape; returning ORJSONResponse directly skips
+    # FastAPI's jsonable_encoder pass over every lead
+    leads_dict = [lead.to_dict() for lead in leads]
+    return ORJSONResponse({
         "success": True,
         "leads": leads_dict,
         "total": len(leads_dict)
-    }
+    })
 
 
 @app.get("/api/leads/{lead_id}")
-async def get_lead(lead_id: int):
+def get_lead(lead_id: int):
     """Get a single lead by ID"""
     session = db.get_session()
     try:
@@ -494,7 +524,7 @@ async def get_lead(lead_id: int):
 
 
 @app.put("/api/leads/{lead_id}/replied")
-async def mark_lead_replied(lead_id: int):
+def mark_lead_replied(lead_id: int):
     """Mark a lead as replied"""
     session = db.get_session()
     try:
@@ -509,7 +539,7 @@ async def mark_lead_replied(lead_id: int):
 
 
 @app.delete("/api/leads/{lead_id}")
-async def delete_lead(lead_id: int):
+def delete_lead(lead_id: int):
     """Delete a single lead and update campaign count"""
     try:
         success = db.delete_lead(lead_id)
@@ -523,7 +553,7 @@ async def delete_lead(lead_id: int):
 
 
 @app.delete("/api/leads")
-async def delete_all_leads():
+def delete_all_leads():
     """Delete all leads and update campaign counts"""
     count = db.delete_all_leads()
     # Campaign counts are automatically updated in delete_all_leads method
@@ -531,28 +561,26 @@ async def delete_all_leads():
 
 
 @app.get("/api/campaigns")
-async def get_campaigns():
+def get_campaigns():
     """Get all campaigns with updated lead counts"""
     campaigns = db.get_all_campaigns_with_lead_count()
-    return {
+    # Campaign.to_dict() defines the response shape, so skip jsonable_encoder
+    return ORJSONResponse({
         "success": True,
         "campaigns": [c.to_dict() for c in campaigns]
-    }
+    })
 
 
 @app.get("/api/campaigns/{campaign_id}")
-async def get_campaign(campaign_id: str):
+def get_campaign(campaign_id: str):
     """Get a single campaign"""
     campaign = db.get_campaign(campaign_id)
     if not campaign:
         raise HTTPException(status_code=404, detail="Campaign not found")
-    # Update lead count before returning
-    db.update_campaign_lead_count(campaign_id)
-    campaign = db.get_campaign(campaign_id)  # Refresh to get updated count
     return {"success": True, "campaign": campaign.to_dict()}
 
 @app.delete("/api/campaigns/{campaign_id}")
-async def delete_campaign(campaign_id: str):
+def delete_campaign(campaign_id: str):
     """Delete a campaign and all its leads"""
     try:
         success = db.delete_campaign(campaign_id)
@@ -565,18 +593,20 @@ async def delete_campaign(campaign_id: str):
 
 
 @app.get("/api/stats")
-async def get_statistics():
+def get_statistics():
     """Get statistics"""
     try:
-        all_leads = db.get_all_leads(limit=1000)
-        return {
+        stats = db.get_lead_stats()
+        by_status = stats["by_status"]
+        # Plain ints only, so skip jsonable_encoder
+        return ORJSONResponse({
             "success": True,
-            "total_leads": len(all_leads),
-            "emailed": len([l for l in all_leads if l.status == "emailed"]),
-            "replied": len([l for l in all_leads if l.has_replied]),
-            "found": len([l for l in all_leads if l.status == "found"]),
-            "followed_up": len([l for l in all_leads if l.status == "followed_up"])
-        }
+            "total_leads": stats["total"],
+            "emailed": by_status.get("emailed", 0),
+            "replied": stats["replied"],
+            "found": by_status.get("found", 0),
+            "followed_up": by_status.get("followed_up", 0)
+        })
     except Exception as e:
         import traceback
         print(f"ERROR in get_statistics: {traceback.format_exc()}")
@@ -592,45 +622,19 @@ async def get_statistics():
 
 
 @app.get("/api/analytics/timeseries")
-async def get_timeseries_analytics(days: int = 30):
+def get_timeseries_analytics(days: int = 30):
     """Get time-series analytics for lead growth"""
     try:
-        from datetime import timedelta
-        all_leads = db.get_all_leads(limit=10000)
-        
         # Calculate date range
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days)
         
-        # Group leads by date
-        daily_counts = {}
-        for lead in all_leads:
-            if lead.created_at:
-                try:
-                    lead_date = lead.created_at.date()
-                    if start_date.date() <= lead_date <= end_date.date():
-                        date_str = lead_date.isoformat()
-                        daily_counts[date_str] = daily_counts.get(date_str, 0) + 1
-                except Exception as e:
-                    print(f"Error processing lead date: {e}")
-                    continue
-        
-        # Create sorted list of dates
-        dates = sorted(daily_counts.keys()) if daily_counts else []
-        counts = [daily_counts[date] for date in dates] if dates else []
+        # Group leads by date in SQL
+        daily_counts = db.get_daily_lead_counts(start_date.date(), end_date.date())
+        dates = [date_str for date_str, _ in daily_counts]
+        counts = [count for _, count in daily_counts]
         
-        # Calculate cumulative
-        cumulative = []
-        total = 0
-        for count in counts:
-            total += count
-            cumulative.append(total)
-        
-        # Ensure we have at least empty arrays
-        if not dates:
-            dates = []
-            counts = []
-            cumulative = []
+        cumulative = list(accumulate(counts))
         
         return {
             "success": True,
@@ -651,15 +655,14 @@ async def get_timeseries_analytics(days: int = 30):
 
 
 @app.get("/api/analytics/funnel")
-async def get_funnel_analytics():
+def get_funnel_analytics():
     """Get conversion funnel data"""
-    all_leads = db.get_all_leads(limit=10000)
+    stats = db.get_lead_stats()
     
-    total = len(all_leads)
-    found = len([l for l in all_leads if l.status == "found"])
-    emailed = len([l for l in all_leads if l.status == "emailed"])
-    followed_up = len([l for l in all_leads if l.status == "followed_up"])
-    replied = len([l for l in all_leads if l.has_replied])
+    total = stats["total"]
+    emailed = stats["by_status"].get("emailed", 0)
+    followed_up = stats["by_status"].get("followed_up", 0)
+    replied = stats["replied"]
     
     return {
         "success": True,
@@ -673,30 +676,13 @@ async def get_funnel_analytics():
 
 
 @app.get("/api/analytics/sources")
-async def get_source_analytics():
+def get_source_analytics():
     """Get lead source analytics"""
     try:
-        all_leads = db.get_all_leads(limit=10000)
-        
-        # Group by campaign
-        campaign_sources = {}
-        for lead in all_leads:
-            if lead.campaign_id:
-                try:
-                    campaign = db.get_campaign(lead.campaign_id)
-                    if campaign:
-                        campaign_name = campaign.name or "Unnamed Campaign"
-                        campaign_sources[campaign_name] = campaign_sources.get(campaign_name, 0) + 1
-                except Exception as e:
-                    print(f"Error processing campaign for lead {lead.id}: {e}")
-                    continue
-        
-        # Sort by count
-        sorted_sources = sorted(campaign_sources.items(), key=lambda x: x[1], reverse=True)
-        
+        # Grouped by campaign and sorted by count in SQL
         return {
             "success": True,
-            "sources": [{"name": name, "count": count} for name, count in sorted_sources] if sorted_sources else []
+            "sources": [{"name": name, "count": count} for name, count in db.get_campaign_source_counts()]
         }
     except Exception as e:
         import traceback
@@ -709,31 +695,19 @@ async def get_source_analytics():
 
 
 @app.get("/api/analytics/campaigns")
-async def get_campaign_analytics():
+def get_campaign_analytics():
     """Get campaign performance analytics"""
     try:
-        campaigns = db.get_all_campaigns()
-        
         campaign_data = []
-        all_leads = db.get_all_leads(limit=10000)
-        
-        for campaign in campaigns:
-            try:
-                campaign_leads = [l for l in all_leads if l.campaign_id == campaign.id]
-                
-                emailed = len([l for l in campaign_leads if l.status == "emailed"])
-                replied = len([l for l in campaign_leads if l.has_replied])
-                
-                campaign_data.append({
-                    "name": campaign.name or "Unnamed Campaign",
-                    "total": len(campaign_leads),
-                    "emailed": emailed,
-                    "replied": replied,
-                    "reply_rate": (replied / len(campaign_leads) * 100) if len(campaign_leads) > 0 else 0.0
-                })
-            except Exception as e:
-                print(f"Error processing campaign {campaign.id}: {e}")
-                continue
+        for campaign in db.get_campaign_stats():
+            total = campaign["total"]
+            campaign_data.append({
+                "name": campaign["name"] or "Unnamed Campaign",
+                "total": total,
+                "emailed": campaign["emailed"],
+                "replied": campaign["replied"],
+                "reply_rate": (campaign["replied"] / total * 100) if total > 0 else 0.0
+            })
         
         return {
             "success": True,
@@ -750,7 +724,7 @@ async def get_campaign_analytics():
 
 
 @app.post("/api/followup/check")
-async def check_followups():
+def check_followups():
     """Manually trigger follow-up check"""
     try:
         scheduler.check_followups_now()
@@ -770,9 +744,9 @@ async def get_followup_status():
 
 
 @app.post("/api/email/test")
-async def test_email():
+def test_email():
     """Test email configuration"""
-    if not config.SMTP_USERNAME or not config.SMTP_PASSWORD:
+    if not config.SMTP_CONFIGURED:
         raise HTTPException(status_code=400, detail="SMTP credentials not configured")
     
     result = email_sender.send_email(
@@ -787,5 +761,7 @@ async def test_email():
 
 
 if __name__ == "__main__":
-    uvicorn.run("backend:app", host="0.0.0.0", port=8000, reload=True)
+    # Auto-reload is for development only; run.py starts multiple workers in production
+    uvicorn.run("backend:app", host="0.0.0.0", port=8000, reload=os.getenv("ENVIRONMENT") != "production",
+                loop="uvloop", http="httptools")
 
@@ -0,0 +1,131 @@
+"""
+Caches for expensive lookups (LLM extractions, search results)
+TTLCache persists entries to SQLite behind an in-memory LRU;
+SemanticCache matches paraphrased queries by embedding similarity
+"""
+import hashlib
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, List, Optional
+import orjson
+import config
+
+
+def make_cache_key(*parts: Any) -> str:
+    """Stable hash of JSON-serialisable parts (dict key order doesn't matter)"""
+    return hashlib.sha256(orjson.dumps(parts, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+class TTLCache:
+    """Thread-safe key/value cache for JSON-serialisable values"""
+
+    def __init__(self, namespace: str, ttl_seconds: float,
+                 db_path: str = config.CACHE_DB_PATH, memory_size: int = 1024):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.memory_size = memory_size
+        self.stats = {"hits": 0, "misses": 0}
+        # Values are kept serialised so callers can't mutate a cached entry
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, payload)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock:
+            if db_path != ":memory:":
+                # Every set() commits, so keep those commits cheap
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, "
+                "expires_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+            )
+            self._conn.execute("DELETE FROM cache_entries WHERE expires_at < ?", (time.time(),))
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                row = self._conn.execute(
+                    "SELECT expires_at, value FROM cache_entries WHERE namespace = ? AND key = ?",
+                    (self.namespace, key)
+                ).fetchone()
+                if row:
+                    entry = (row[0], row[1])
+                    self._remember(key, entry)
+            if entry is None or entry[0] <= now:
+                self.stats["misses"] += 1
+                return None
+            self._memory.move_to_end(key)
+            self.stats["hits"] += 1
+        return orjson.loads(entry[1])
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        """Store a value for ttl_seconds (defaults to the cache's TTL)"""
+        expires_at = time.time() + (ttl_seconds or self.ttl_seconds)
+        payload = orjson.dumps(value)
+        with self._lock:
+            self._remember(key, (expires_at, payload))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (self.namespace, key, payload, expires_at)
+            )
+            self._conn.commit()
+
+    def _remember(self, key: str, entry: tuple):
+        """Put an entry in the in-memory LRU, evicting the oldest if full"""
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+
+class SemanticCache:
+    """
+    In-memory nearest-neighbour cache keyed by embedding vectors
+    A lookup hits when the cosine similarity to a stored vector reaches threshold
+    """
+
+    def __init__(self, threshold: float, ttl_seconds: float, max_entries: int = 256):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.stats = {"hits": 0, "misses": 0}
+        self._entries: list = []  # (expires_at, unit_vector, payload), oldest first
+        self._lock = threading.Lock()
+
+    def get(self, embedding: List[float]) -> Optional[Any]:
+        """Return the value stored for the most similar vector, if similar enough"""
+        query = _unit_vector(embedding)
+        now = time.time()
+        with self._lock:
+            self._entries = [entry for entry in self._entries if entry[0] > now]
+            best_score, best_payload = 0.0, None
+            for _, vector, payload in self._entries:
+                score = sum(a * b for a, b in zip(query, vector))
+                if score > best_score:
+                    best_score, best_payload = score, payload
+            if best_payload is None or best_score < self.threshold:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+        return orjson.loads(best_payload)
+
+    def set(self, embedding: List[float], value: Any):
+        """Store a value under an embedding, evicting the oldest entry if full"""
+        entry = (time.time() + self.ttl_seconds, _unit_vector(embedding), orjson.dumps(value))
+        with self._lock:
+            self._entries.append(entry)
+            if len(self._entries) > self.max_entries:
+                self._entries.pop(0)
+
+
+def _unit_vector(vector: List[float]) -> List[float]:
+    """L2-normalise a vector so dot products are cosine similarities"""
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
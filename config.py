@@ -19,14 +19,81 @@ SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
 SMTP_USERNAME = os.getenv("SMTP_USERNAME", "")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")  # Use App Password for Gmail
 EMAIL_FROM = os.getenv("EMAIL_FROM", "")
+SMTP_CONFIGURED = bool(SMTP_USERNAME and SMTP_PASSWORD)  # Computed once; config doesn't change at runtime
+SMTP_SENDER = EMAIL_FROM or SMTP_USERNAME  # From address actually used
+SMTP_TIMEOUT_SECONDS = int(os.getenv("SMTP_TIMEOUT_SECONDS", "30"))  # Providers recommend at least 30s
+# Logged-in SMTP connections kept open between single sends, and how long an idle one is reused
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "4"))
+SMTP_IDLE_TIMEOUT_SECONDS = int(os.getenv("SMTP_IDLE_TIMEOUT_SECONDS", "60"))
+# Delivered leads are marked in the DB every this many sends, so a killed batch doesn't resend them
+SEND_RECORD_BATCH_SIZE = int(os.getenv("SEND_RECORD_BATCH_SIZE", "10"))
 
 # Database
 # Use environment variable for database path (useful for cloud deployments)
 DATABASE_PATH = os.getenv("DATABASE_PATH", "leads.db")
+# Connection pool shared by the threadpool that runs the blocking endpoints
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# Dashboard aggregates are reused for this long unless this process writes to the DB
+ANALYTICS_CACHE_TTL_SECONDS = int(os.getenv("ANALYTICS_CACHE_TTL_SECONDS", "30"))
+# Optional Redis (e.g. redis://localhost:6379/0) to share that cache across workers
+REDIS_URL = os.getenv("REDIS_URL", "")
+
+# HTTP response cache (used when requests-cache is installed)
+HTTP_CACHE_ENABLED = os.getenv("HTTP_CACHE_ENABLED", "true").lower() == "true"
+HTTP_CACHE_PATH = os.getenv("HTTP_CACHE_PATH", "lead_cache.sqlite")
+
+# Persistent cache for LLM extractions and other expensive lookups
+CACHE_DB_PATH = os.getenv("CACHE_DB_PATH", "lead_data_cache.sqlite")
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_TTL_DAYS = int(os.getenv("LLM_CACHE_TTL_DAYS", "7"))
+
+# Reuse search results for paraphrased queries (matched by embedding similarity)
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_TTL_HOURS = int(os.getenv("SEMANTIC_CACHE_TTL_HOURS", "24"))
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+
+# Number of websites enriched in parallel (shared across concurrent discovery requests)
+ENRICH_CONCURRENCY = int(os.getenv("ENRICH_CONCURRENCY", "16"))
+# Threads shared by all page fetches (homepage, /contact, /about...) across sites
+PAGE_FETCH_WORKERS = int(os.getenv("PAGE_FETCH_WORKERS", "32"))
+# Concurrent LLM calls when a discovery wave's extractions are batched (rate limits are retried)
+EXTRACTION_CONCURRENCY = int(os.getenv("EXTRACTION_CONCURRENCY", "16"))
+
+# Cache the scraper session's DNS lookups in-process and resolve all candidate hosts up front
+DNS_CACHE_ENABLED = os.getenv("DNS_CACHE_ENABLED", "true").lower() == "true"
+DNS_CACHE_TTL_SECONDS = int(os.getenv("DNS_CACHE_TTL_SECONDS", "300"))
+DNS_CACHE_MAX_ENTRIES = int(os.getenv("DNS_CACHE_MAX_ENTRIES", "2048"))
 
 # LLM Configuration
 LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini")  # or "gpt-4o" or "claude-3-5-sonnet-20241022"
+LLM_MODEL_FAST = os.getenv("LLM_MODEL_FAST", "gpt-4o-mini")  # Small model for yes/no validation
+VALIDATION_BATCH_SIZE = int(os.getenv("VALIDATION_BATCH_SIZE", "15"))  # Leads packed into one validation prompt
+EMAIL_GENERATION_CONCURRENCY = int(os.getenv("EMAIL_GENERATION_CONCURRENCY", "16"))  # Parallel copywriter LLM calls
+EMAIL_GENERATION_BATCH_SIZE = int(os.getenv("EMAIL_GENERATION_BATCH_SIZE", "20"))  # Leads generated per bulk-send batch
+BULK_SEND_WORKERS = int(os.getenv("BULK_SEND_WORKERS", "4"))  # Parallel SMTP connections for a bulk send
+
+# Verify guessed emails against the domain's mail server (needs dnspython and outbound port 25)
+EMAIL_VERIFY_ENABLED = os.getenv("EMAIL_VERIFY_ENABLED", "false").lower() == "true"
+EMAIL_VERIFY_FROM = os.getenv("EMAIL_VERIFY_FROM", EMAIL_FROM)  # Empty means the null sender <>
+EMAIL_VERIFY_TIMEOUT = 5  # Seconds per DNS/SMTP probe
 
 # Follow-up settings
 FOLLOW_UP_DAYS = 7
+# Run the follow-up scheduler in this process; with several workers only the one
+# holding SCHEDULER_LOCK_PATH runs it
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+SCHEDULER_LOCK_PATH = os.getenv("SCHEDULER_LOCK_PATH", "followup_scheduler.lock")
+# DB lease a follow-up cycle holds, renewed every third of it; a crashed holder blocks others this long
+SCHEDULER_LEASE_SECONDS = int(os.getenv("SCHEDULER_LEASE_SECONDS", "300"))
+FOLLOWUP_SEND_WORKERS = int(os.getenv("FOLLOWUP_SEND_WORKERS", "4"))  # Parallel SMTP connections per follow-up cycle
+# A follow-up cycle of at least FOLLOWUP_ABORT_MIN_BATCH leads stops sending once more than
+# FOLLOWUP_ABORT_FAILURE_RATIO of them fail, and retries later with exponential backoff
+FOLLOWUP_ABORT_MIN_BATCH = int(os.getenv("FOLLOWUP_ABORT_MIN_BATCH", "30"))
+FOLLOWUP_ABORT_FAILURE_RATIO = float(os.getenv("FOLLOWUP_ABORT_FAILURE_RATIO", "0.33"))
+# The scheduler wakes when the next follow-up falls due (but no sooner than this after a check),
+# and backs off to at most SCHEDULER_MAX_IDLE_FACTOR x its interval while none are upcoming
+SCHEDULER_MIN_DELAY_SECONDS = int(os.getenv("SCHEDULER_MIN_DELAY_SECONDS", "30"))
+SCHEDULER_MAX_IDLE_FACTOR = int(os.getenv("SCHEDULER_MAX_IDLE_FACTOR", "4"))
 
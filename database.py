@@ -2,16 +2,106 @@
 Database models and operations for the Lead Generation System
 Uses SQLite for storage
 """
-from sqlalchemy import create_engine, Column, String, Integer, DateTime, JSON, Boolean
+from sqlalchemy import Row, bindparam, create_engine, Column, String, Integer, DateTime, JSON, Boolean, Index, event, func, case, or_, text, select, update, delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from datetime import datetime
-import json
-from typing import Optional, List, Dict
+from sqlalchemy.orm import Session, sessionmaker, validates
+from sqlalchemy.pool import QueuePool, StaticPool
+from contextlib import contextmanager
+from datetime import datetime, date, time, timedelta
+from pathlib import Path
+import functools
+import sqlite3
+import threading
+import time as _time
+from typing import Iterator, Optional, List, Dict
+import orjson
 import config
+from cache import make_cache_key
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
 
 Base = declarative_base()
 
+# Analytics reads are cached briefly in-process; every write clears the cache and bumps
+# the version, so a result computed while a write landed is never stored
+_data_version = 0
+_analytics_cache: Dict[tuple, tuple] = {}  # (db url, method, args) -> (expires_at, value)
+_analytics_cache_lock = threading.Lock()
+
+# With REDIS_URL set, the cache lives in Redis instead, shared by every worker; writes bump
+# a version counter there that is part of every key
+_REDIS_VERSION_KEY = "lead_analytics:version"
+_redis_client = None
+if REDIS_AVAILABLE and config.REDIS_URL:
+    _redis_client = redis.Redis.from_url(config.REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+
+def _bump_data_version():
+    """Invalidate cached analytics after a write"""
+    global _data_version
+    with _analytics_cache_lock:
+        _data_version += 1
+        _analytics_cache.clear()
+    if _redis_client is not None:
+        try:
+            _redis_client.incr(_REDIS_VERSION_KEY)
+        except redis.RedisError as e:
+            print(f"⚠️ Could not invalidate Redis analytics cache: {e}")
+
+
+def _redis_cached(method, self, args):
+    """Serve an aggregate from Redis, computing and storing it on a miss"""
+    version = int(_redis_client.get(_REDIS_VERSION_KEY) or 0)
+    key = f"lead_analytics:{version}:{make_cache_key(str(self.engine.url), method.__name__, args)}"
+    payload = _redis_client.get(key)
+    if payload is not None:
+        return orjson.loads(payload)
+    value = method(self, *args)
+    _redis_client.set(key, orjson.dumps(value), ex=config.ANALYTICS_CACHE_TTL_SECONDS)
+    return value
+
+
+def _cached_analytics(method):
+    """Cache a read-only aggregate for ANALYTICS_CACHE_TTL_SECONDS or until the next write"""
+    @functools.wraps(method)
+    def wrapper(self, *args):
+        if _redis_client is not None:
+            try:
+                return _redis_cached(method, self, args)
+            except redis.RedisError as e:
+                print(f"⚠️ Redis analytics cache unavailable, using in-process cache: {e}")
+        key = (str(self.engine.url), method.__name__, args)
+        now = _time.time()
+        with _analytics_cache_lock:
+            entry = _analytics_cache.get(key)
+            if entry and entry[0] > now:
+                return entry[1]
+            version = _data_version
+        value = method(self, *args)
+        with _analytics_cache_lock:
+            if version == _data_version:
+                _analytics_cache[key] = (now + config.ANALYTICS_CACHE_TTL_SECONDS, value)
+        return value
+    return wrapper
+
+
+def _as_company_dict(value) -> Dict:
+    """company_data as a dict: JSON strings are parsed, anything unusable becomes {}"""
+    if isinstance(value, dict):
+        return value
+    if isinstance(value, str) and value:
+        try:
+            value = orjson.loads(value)
+        except orjson.JSONDecodeError:
+            return {}
+        return value if isinstance(value, dict) else {}
+    return {}
+
 
 class Campaign(Base):
     """Campaign model to store campaign information"""
@@ -39,34 +129,38 @@ class Campaign(Base):
 class Lead(Base):
     """Lead model to store discovered leads"""
     __tablename__ = "leads"
+    __table_args__ = (
+        # Campaign pages and bulk sends filter by campaign and then status
+        Index("ix_leads_campaign_status", "campaign_id", "status"),
+        # get_leads_needing_followup: two equality filters, then a range on the date
+        Index("ix_leads_followup", "status", "has_replied", "follow_up_date"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     email = Column(String, unique=True, nullable=False, index=True)
     name = Column(String)
     company_name = Column(String)
     company_data = Column(JSON)  # Stores scraped info as JSON
-    campaign_id = Column(String, index=True)
-    status = Column(String, default="found")  # found, emailed, followed_up, replied
+    campaign_id = Column(String)  # Indexed by ix_leads_campaign_status
+    status = Column(String, default="found", index=True)  # found, emailed, followed_up, replied
     email_content = Column(String)  # Store the generated email
     follow_up_date = Column(DateTime, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     last_contacted_at = Column(DateTime, nullable=True)
     sent_email_at = Column(DateTime, nullable=True)
-    has_replied = Column(Boolean, default=False)
+    has_replied = Column(Boolean, default=False, index=True)
+
+    @validates("company_data")
+    def _normalize_company_data(self, key, value) -> Dict:
+        """Store company_data as a dict whatever the caller passes, so reads can trust it"""
+        return _as_company_dict(value)
 
     def to_dict(self) -> Dict:
         """Convert lead to dictionary for display"""
-        # Safely parse company_data
-        company_data = {}
-        if self.company_data:
-            if isinstance(self.company_data, dict):
-                company_data = self.company_data
-            elif isinstance(self.company_data, str):
-                try:
-                    company_data = json.loads(self.company_data)
-                except (json.JSONDecodeError, TypeError):
-                    # If parsing fails, return empty dict
-                    company_data = {}
+        # New rows are normalised on write; only rows stored before that can hold a string
+        company_data = self.company_data
+        if not isinstance(company_data, dict):
+            company_data = _as_company_dict(company_data)
         
         return {
             "id": self.id,
@@ -77,185 +171,430 @@ class Lead(Base):
             "campaign_id": self.campaign_id,
             "status": self.status,
             "email_content": self.email_content,
-            "follow_up_date": self.follow_up_date.isoformat() if self.follow_up_date else None,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "last_contacted_at": self.last_contacted_at.isoformat() if self.last_contacted_at else None,
-            "sent_email_at": self.sent_email_at.isoformat() if self.sent_email_at else None,
-            "has_replied": self.has_replied,
+            # Datetimes stay datetime objects; orjson (and jsonable_encoder) write them as ISO 8601
+            "follow_up_date": self.follow_up_date,
+            "created_at": self.created_at,
+            "last_contacted_at": self.last_contacted_at,
+            "sent_email_at": self.sent_email_at,
+            "has_replied": bool(self.has_replied),
         }
 
 
+class LeadCounter(Base):
+    """Running lead counts ('total', 'replied', 'status:<status>'), kept current by triggers"""
+    __tablename__ = "lead_counters"
+
+    key = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class SchedulerLease(Base):
+    """A named lock held until expires_at, so only one process runs a job at a time"""
+    __tablename__ = "scheduler_leases"
+
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+
+# SQLite triggers keep lead_counters in step with every insert, delete and status/reply
+# change on leads, whichever code path (ORM object, bulk query, raw SQL) makes it
+_LEAD_COUNTER_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS lead_counters_insert AFTER INSERT ON leads BEGIN
+        INSERT OR IGNORE INTO lead_counters (key, count)
+            VALUES ('total', 0), ('replied', 0), ('status:' || COALESCE(NEW.status, ''), 0);
+        UPDATE lead_counters SET count = count + 1 WHERE key IN ('total', 'status:' || COALESCE(NEW.status, ''));
+        UPDATE lead_counters SET count = count + 1 WHERE key = 'replied' AND COALESCE(NEW.has_replied, 0);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS lead_counters_delete AFTER DELETE ON leads BEGIN
+        UPDATE lead_counters SET count = count - 1 WHERE key IN ('total', 'status:' || COALESCE(OLD.status, ''));
+        UPDATE lead_counters SET count = count - 1 WHERE key = 'replied' AND COALESCE(OLD.has_replied, 0);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS lead_counters_update AFTER UPDATE OF status, has_replied ON leads BEGIN
+        INSERT OR IGNORE INTO lead_counters (key, count) VALUES ('status:' || COALESCE(NEW.status, ''), 0);
+        UPDATE lead_counters SET count = count - 1 WHERE key = 'status:' || COALESCE(OLD.status, '');
+        UPDATE lead_counters SET count = count + 1 WHERE key = 'status:' || COALESCE(NEW.status, '');
+        UPDATE lead_counters SET count = count + COALESCE(NEW.has_replied, 0) - COALESCE(OLD.has_replied, 0)
+            WHERE key = 'replied';
+    END""",
+]
+
+# Campaign.lead_count is maintained the same way, so reading a campaign never needs a COUNT(*)
+_CAMPAIGN_COUNT_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS campaign_lead_count_insert AFTER INSERT ON leads
+    WHEN NEW.campaign_id IS NOT NULL BEGIN
+        UPDATE campaigns SET lead_count = COALESCE(lead_count, 0) + 1 WHERE id = NEW.campaign_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS campaign_lead_count_delete AFTER DELETE ON leads
+    WHEN OLD.campaign_id IS NOT NULL BEGIN
+        UPDATE campaigns SET lead_count = COALESCE(lead_count, 0) - 1 WHERE id = OLD.campaign_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS campaign_lead_count_update AFTER UPDATE OF campaign_id ON leads
+    WHEN OLD.campaign_id IS NOT NEW.campaign_id BEGIN
+        UPDATE campaigns SET lead_count = COALESCE(lead_count, 0) - 1 WHERE id = OLD.campaign_id;
+        UPDATE campaigns SET lead_count = COALESCE(lead_count, 0) + 1 WHERE id = NEW.campaign_id;
+    END""",
+]
+
+_CAMPAIGN_RECOUNT = (
+    "UPDATE campaigns SET lead_count = "
+    "(SELECT COUNT(*) FROM leads WHERE leads.campaign_id = campaigns.id)"
+)
+
+
+def _orjson_dumps(value) -> str:
+    """orjson.dumps as text, for SQLAlchemy's JSON column serializer"""
+    return orjson.dumps(value).decode()
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """WAL so dashboard reads don't wait on writers, lock waits instead of errors, bigger caches"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")  # Durable enough under WAL, far fewer fsyncs
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.execute("PRAGMA temp_store=MEMORY")  # Sorts and GROUP BY temp tables stay off disk
+    cursor.execute("PRAGMA cache_size=-65536")  # 64 MB page cache per connection
+    cursor.close()
+
+
+def _set_sqlite_read_pragmas(dbapi_connection, connection_record):
+    """Read-only connections: the writer already set WAL; same lock wait and caches"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-65536")
+    cursor.close()
+
+
 class Database:
     """Database operations wrapper"""
     
     def __init__(self, db_path: str = config.DATABASE_PATH):
-        self.engine = create_engine(f"sqlite:///{db_path}", echo=False)
+        engine_options = dict(
+            echo=False,
+            connect_args={"check_same_thread": False},
+            # JSON columns (company_data) go through orjson instead of the stdlib json module
+            json_serializer=_orjson_dumps,
+            json_deserializer=orjson.loads,
+        )
+        if db_path != ":memory:":
+            # Endpoints run in FastAPI's threadpool, so size the pool for concurrent requests
+            # rather than SQLAlchemy's default of 5
+            engine_options.update(
+                poolclass=QueuePool,
+                pool_size=config.DB_POOL_SIZE,
+                max_overflow=config.DB_MAX_OVERFLOW,
+                pool_pre_ping=True,
+            )
+        else:
+            # Every new connection would open its own empty in-memory database, so share one
+            engine_options.update(poolclass=StaticPool)
+        self.engine = create_engine(f"sqlite:///{db_path}", **engine_options)
+        if db_path != ":memory:":  # WAL needs a database file
+            event.listen(self.engine, "connect", _set_sqlite_pragmas)
         Base.metadata.create_all(self.engine)
+        # create_all skips tables that already exist, so add indexes introduced later by hand
+        for index in Lead.__table__.indexes:
+            index.create(self.engine, checkfirst=True)
+        with self.engine.begin() as conn:
+            counters_missing = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'lead_counters_insert'")
+            ).first() is None
+            campaign_counts_missing = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'campaign_lead_count_insert'")
+            ).first() is None
+            for trigger in _LEAD_COUNTER_TRIGGERS + _CAMPAIGN_COUNT_TRIGGERS:
+                conn.execute(text(trigger))
+            if campaign_counts_missing:
+                conn.execute(text(_CAMPAIGN_RECOUNT))
         self.Session = sessionmaker(bind=self.engine)
+        # List and analytics reads use their own read-only connections, so under WAL they
+        # never hold a connection a writer could be waiting for
+        if db_path != ":memory:":
+            read_uri = f"{Path(db_path).resolve().as_uri()}?mode=ro"
+            self.read_engine = create_engine(
+                "sqlite://",
+                creator=lambda: sqlite3.connect(read_uri, uri=True, check_same_thread=False),
+                **{**engine_options, "connect_args": {}}
+            )
+            event.listen(self.read_engine, "connect", _set_sqlite_read_pragmas)
+        else:
+            self.read_engine = self.engine
+        self.ReadSession = sessionmaker(bind=self.read_engine)
+        if counters_missing:
+            # Databases created before the counters existed
+            self.recount_leads()
     
     def get_session(self):
         """Get a new database session"""
         return self.Session()
     
+    @contextmanager
+    def session_scope(self, expire_on_commit: bool = True) -> Iterator[Session]:
+        """Session for one unit of work: rolled back if the block raises, always closed"""
+        session = self.Session(expire_on_commit=expire_on_commit)
+        try:
+            yield session
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+    
+    @contextmanager
+    def read_scope(self) -> Iterator[Session]:
+        """Read-only session for list and analytics queries, always closed"""
+        session = self.ReadSession()
+        try:
+            yield session
+        finally:
+            session.close()
+    
     def add_lead(self, email: str, name: Optional[str] = None, 
                  company_name: Optional[str] = None, 
                  company_data: Optional[Dict] = None,
                  campaign_id: Optional[str] = None) -> Lead:
-        """Add a new lead to the database"""
-        session = self.get_session()
-        try:
-            # Check if lead already exists
-            existing = session.query(Lead).filter_by(email=email).first()
-            if existing:
-                return existing
-            
-            lead = Lead(
-                email=email,
-                name=name,
-                company_name=company_name,
-                company_data=company_data or {},
-                campaign_id=campaign_id
-            )
-            session.add(lead)
+        """Add a new lead to the database (returns the existing lead if the email is taken)"""
+        return self.add_leads([{
+            "email": email,
+            "name": name,
+            "company_name": company_name,
+            "company_data": company_data,
+            "campaign_id": campaign_id
+        }])[0]
+    
+    def add_leads(self, leads: List[Dict]) -> List[Lead]:
+        """
+        Add many leads in one transaction
+        Each dict takes add_lead's arguments; returns one Lead per dict, in order
+        (the existing lead when the email is already stored)
+        """
+        if not leads:
+            return []
+        # Keep attributes loaded after commit so callers can read the returned leads
+        with self.session_scope(expire_on_commit=False) as session:
+            emails = [lead["email"] for lead in leads]
+            by_email = {
+                lead.email: lead
+                for lead in session.query(Lead).filter(Lead.email.in_(emails)).all()
+            }
+            # One timestamp for the whole batch rather than a utcnow() call per row
+            created_at = datetime.utcnow()
+            for data in leads:
+                if data["email"] in by_email:
+                    continue
+                lead = Lead(
+                    email=data["email"],
+                    name=data.get("name"),
+                    company_name=data.get("company_name"),
+                    company_data=data.get("company_data") or {},
+                    campaign_id=data.get("campaign_id"),
+                    created_at=created_at
+                )
+                session.add(lead)
+                by_email[lead.email] = lead
             session.commit()
-            session.refresh(lead)
-            return lead
-        except Exception as e:
-            session.rollback()
-            raise e
-        finally:
-            session.close()
+            _bump_data_version()
+            return [by_email[email] for email in emails]
+    
+    def get_existing_emails(self, emails: List[str]) -> set:
+        """Return which of the given emails already belong to a lead, in one query"""
+        if not emails:
+            return set()
+        with self.session_scope() as session:
+            rows = session.query(Lead.email).filter(Lead.email.in_(set(emails))).all()
+            return {email for (email,) in rows}
     
     def get_lead_by_email(self, email: str) -> Optional[Lead]:
         """Get a lead by email address"""
-        session = self.get_session()
-        try:
+        with self.session_scope() as session:
             return session.query(Lead).filter_by(email=email).first()
-        finally:
-            session.close()
     
     def update_lead_status(self, email: str, status: str, 
                           email_content: Optional[str] = None):
-        """Update lead status and email content"""
-        session = self.get_session()
-        try:
-            lead = session.query(Lead).filter_by(email=email).first()
-            if lead:
-                lead.status = status
-                lead.last_contacted_at = datetime.utcnow()
-                if email_content:
-                    lead.email_content = email_content
-                if status == "emailed":
-                    lead.sent_email_at = datetime.utcnow()
-                    # Set follow-up date
-                    from datetime import timedelta
-                    lead.follow_up_date = datetime.utcnow() + timedelta(days=config.FOLLOW_UP_DAYS)
-                session.commit()
-        except Exception as e:
-            session.rollback()
-            raise e
-        finally:
-            session.close()
+        """Update lead status and email content, in a single UPDATE"""
+        now = datetime.utcnow()
+        values = {"status": status, "last_contacted_at": now}
+        if email_content:
+            values["email_content"] = email_content
+        if status == "emailed":
+            values["sent_email_at"] = now
+            # Set follow-up date
+            values["follow_up_date"] = now + timedelta(days=config.FOLLOW_UP_DAYS)
+        elif status == "followed_up":
+            values["follow_up_date"] = None  # Clear to prevent re-sending
+        with self.session_scope() as session:
+            result = session.execute(update(Lead).where(Lead.email == email).values(**values))
+            session.commit()
+            if result.rowcount:
+                _bump_data_version()
+    
+    def bulk_update_lead_status(self, status: str, email_contents: Dict[str, Optional[str]]):
+        """
+        update_lead_status for many leads in one transaction: {email: email content or None}
+        The timestamps are shared; each lead keeps its own content (or its old one for None)
+        """
+        if not email_contents:
+            return
+        now = datetime.utcnow()
+        values = {
+            "status": status,
+            "last_contacted_at": now,
+            "email_content": func.coalesce(bindparam("b_content"), Lead.email_content),
+        }
+        if status == "emailed":
+            values["sent_email_at"] = now
+            values["follow_up_date"] = now + timedelta(days=config.FOLLOW_UP_DAYS)
+        elif status == "followed_up":
+            values["follow_up_date"] = None  # Clear to prevent re-sending
+        statement = update(Lead.__table__).where(Lead.email == bindparam("b_email")).values(**values)
+        rows = [{"b_email": email, "b_content": content or None} for email, content in email_contents.items()]
+        with self.session_scope() as session:
+            # One executemany: the statement is compiled once and bound per lead
+            result = session.connection().execute(statement, rows)
+            session.commit()
+            if result.rowcount:
+                _bump_data_version()
     
     def get_leads_by_campaign(self, campaign_id: str) -> List[Lead]:
         """Get all leads for a campaign"""
-        session = self.get_session()
-        try:
+        with self.read_scope() as session:
             return session.query(Lead).filter_by(campaign_id=campaign_id).all()
-        finally:
-            session.close()
     
-    def get_leads_needing_followup(self) -> List[Lead]:
-        """Get leads that need follow-up emails"""
-        session = self.get_session()
-        try:
+    def get_leads_needing_followup(self) -> List[Row]:
+        """
+        Get leads that need follow-up emails, as (email, email_content, follow_up_date) rows
+        Only the columns the scheduler reads, without building ORM objects
+        """
+        with self.session_scope() as session:
             now = datetime.utcnow()
             # Only get leads that:
             # 1. Have a follow-up date that has passed
             # 2. Have been emailed (not already followed up - to prevent multiple follow-ups)
             # 3. Haven't replied
             # 4. Follow-up date is not None (hasn't been cleared)
-            return session.query(Lead).filter(
+            return session.execute(select(Lead.email, Lead.email_content, Lead.follow_up_date).where(
                 Lead.follow_up_date.isnot(None),
                 Lead.follow_up_date <= now,
                 Lead.status == "emailed",  # Only "emailed" status, not "followed_up" to prevent multiple follow-ups
                 Lead.has_replied == False
-            ).all()
-        finally:
-            session.close()
+            )).all()
+    
+    def get_next_follow_up_date(self) -> Optional[datetime]:
+        """When the next not-yet-due follow-up falls due, or None if there is none"""
+        with self.read_scope() as session:
+            return session.query(func.min(Lead.follow_up_date)).filter(
+                Lead.follow_up_date > datetime.utcnow(),
+                Lead.status == "emailed",
+                Lead.has_replied == False
+            ).scalar()
     
     def mark_as_replied(self, email: str):
-        """Mark a lead as having replied"""
-        session = self.get_session()
-        try:
-            lead = session.query(Lead).filter_by(email=email).first()
-            if lead:
-                lead.has_replied = True
-                lead.status = "replied"
-                lead.follow_up_date = None  # Cancel follow-up
-                session.commit()
-        except Exception as e:
-            session.rollback()
-            raise e
-        finally:
-            session.close()
+        """Mark a lead as having replied, in a single UPDATE"""
+        with self.session_scope() as session:
+            result = session.execute(
+                update(Lead).where(Lead.email == email).values(
+                    has_replied=True,
+                    status="replied",
+                    follow_up_date=None  # Cancel follow-up
+                )
+            )
+            session.commit()
+            if result.rowcount:
+                _bump_data_version()
     
     def get_all_leads(self, limit: int = 100) -> List[Lead]:
         """Get all leads with limit"""
-        session = self.get_session()
-        try:
-            return session.query(Lead).order_by(Lead.created_at.desc()).limit(limit).all()
-        finally:
-            session.close()
+        with self.read_scope() as session:
+            return session.query(Lead).order_by(Lead.created_at.desc(), Lead.id.desc()).limit(limit).all()
+    
+    def get_leads(self, campaign_id: Optional[str] = None, status: Optional[str] = None,
+                  limit: int = 100, statuses: Optional[List[str]] = None,
+                  exclude_replied: bool = False, lead_ids: Optional[List[int]] = None) -> List[Lead]:
+        """Get the newest leads, with every filter applied in SQL"""
+        with self.read_scope() as session:
+            query = session.query(Lead)
+            if campaign_id:
+                query = query.filter(Lead.campaign_id == campaign_id)
+            if status:
+                query = query.filter(Lead.status == status)
+            if statuses:
+                query = query.filter(Lead.status.in_(statuses))
+            if exclude_replied:
+                query = query.filter(Lead.has_replied.isnot(True))
+            if lead_ids:
+                query = query.filter(Lead.id.in_(lead_ids))
+            return query.order_by(Lead.created_at.desc(), Lead.id.desc()).limit(limit).all()
+    
+    def get_status_counts(self) -> Dict[tuple, int]:
+        """{(status, has_replied): lead count}, from one GROUP BY over the leads table"""
+        with self.read_scope() as session:
+            rows = session.query(Lead.status, Lead.has_replied, func.count(Lead.id)).group_by(
+                Lead.status, Lead.has_replied
+            ).all()
+            return {(status, bool(has_replied)): count for status, has_replied, count in rows}
+    
+    def recount_leads(self):
+        """Rebuild lead_counters from the leads table in a single scan"""
+        counters = {"total": 0, "replied": 0}
+        for (status, has_replied), count in self.get_status_counts().items():
+            counters["total"] += count
+            if has_replied:
+                counters["replied"] += count
+            status_key = f"status:{status or ''}"
+            counters[status_key] = counters.get(status_key, 0) + count
+        with self.session_scope() as session:
+            session.query(LeadCounter).delete()
+            session.add_all(LeadCounter(key=key, count=count) for key, count in counters.items())
+            session.commit()
+    
+    def get_lead_stats(self) -> Dict:
+        """Lead totals per status plus replies, read from the trigger-maintained counters"""
+        with self.read_scope() as session:
+            counts = dict(session.query(LeadCounter.key, LeadCounter.count).all())
+            return {
+                "total": counts.get("total", 0),
+                "by_status": {
+                    key[len("status:"):]: count
+                    for key, count in counts.items()
+                    if key.startswith("status:") and key != "status:"
+                },
+                "replied": counts.get("replied", 0)
+            }
+    
+    @_cached_analytics
+    def get_daily_lead_counts(self, start_date: date, end_date: date) -> List[tuple]:
+        """(YYYY-MM-DD, count) for each day with new leads between start_date and end_date, oldest first"""
+        with self.read_scope() as session:
+            day = func.date(Lead.created_at)
+            rows = session.query(day, func.count(Lead.id)).filter(
+                Lead.created_at >= datetime.combine(start_date, time.min),
+                Lead.created_at < datetime.combine(end_date + timedelta(days=1), time.min)
+            ).group_by(day).order_by(day).all()
+            return [(str(lead_day), count) for lead_day, count in rows]
     
     def delete_lead(self, lead_id: int) -> bool:
-        """Delete a single lead by ID and update campaign count"""
-        session = self.get_session()
-        try:
-            lead = session.query(Lead).filter_by(id=lead_id).first()
-            if lead:
-                campaign_id = lead.campaign_id
-                session.delete(lead)
-                session.commit()
-                
-                # Update campaign lead count
-                if campaign_id:
-                    self.update_campaign_lead_count(campaign_id)
-                
-                return True
-            return False
-        except Exception as e:
-            session.rollback()
-            raise e
-        finally:
-            session.close()
+        """Delete a single lead by ID (the campaign count follows via trigger)"""
+        with self.session_scope() as session:
+            deleted = session.execute(delete(Lead).where(Lead.id == lead_id)).rowcount
+            session.commit()
+            if deleted:
+                _bump_data_version()
+            return bool(deleted)
     
     def delete_all_leads(self) -> int:
-        """Delete all leads from the database and update all campaign counts. Returns number of leads deleted."""
-        session = self.get_session()
-        try:
-            # Get all campaign IDs before deletion
-            campaign_ids = session.query(Lead.campaign_id).distinct().all()
-            campaign_ids = [c[0] for c in campaign_ids if c[0]]
-            
-            count = session.query(Lead).count()
-            session.query(Lead).delete()
+        """Delete all leads in one statement (campaign counts follow via trigger). Returns number of leads deleted."""
+        with self.session_scope() as session:
+            count = session.execute(delete(Lead)).rowcount
             session.commit()
-            
-            # Update all campaign lead counts
-            for campaign_id in campaign_ids:
-                self.update_campaign_lead_count(campaign_id)
-            
+            _bump_data_version()
             return count
-        except Exception as e:
-            session.rollback()
-            raise e
-        finally:
-            session.close()
     
     def create_campaign(self, campaign_id: str, name: str, search_query: str, notes: Optional[str] = None) -> Campaign:
         """Create a new campaign"""
-        session = self.get_session()
+        # Defaults are filled in Python, so the object is complete after commit without a refresh
+        session = self.Session(expire_on_commit=False)
         try:
             campaign = Campaign(
                 id=campaign_id,
@@ -265,7 +604,7 @@ class Database:
             )
             session.add(campaign)
             session.commit()
-            session.refresh(campaign)
+            _bump_data_version()
             return campaign
         except Exception as e:
             session.rollback()
@@ -279,59 +618,113 @@ class Database:
     
     def get_campaign(self, campaign_id: str) -> Optional[Campaign]:
         """Get a campaign by ID"""
-        session = self.get_session()
-        try:
+        with self.session_scope() as session:
             return session.query(Campaign).filter_by(id=campaign_id).first()
-        finally:
-            session.close()
     
     def get_all_campaigns(self) -> List[Campaign]:
         """Get all campaigns"""
-        session = self.get_session()
-        try:
+        with self.read_scope() as session:
             return session.query(Campaign).order_by(Campaign.created_at.desc()).all()
-        finally:
-            session.close()
     
-    def update_campaign_lead_count(self, campaign_id: str):
-        """Update the lead count for a campaign"""
-        session = self.get_session()
-        try:
+    def update_campaign_lead_count(self, campaign_id: str) -> Optional[Campaign]:
+        """Update the lead count for a campaign and return the campaign (None if missing)"""
+        # Keep attributes loaded after commit so the caller can use the returned campaign
+        with self.session_scope(expire_on_commit=False) as session:
             campaign = session.query(Campaign).filter_by(id=campaign_id).first()
             if campaign:
                 lead_count = session.query(Lead).filter_by(campaign_id=campaign_id).count()
-                campaign.lead_count = lead_count
-                session.commit()
-        except Exception as e:
-            session.rollback()
-            raise e
-        finally:
-            session.close()
+                if campaign.lead_count != lead_count:
+                    campaign.lead_count = lead_count
+                    session.commit()
+            return campaign
     
     def delete_campaign(self, campaign_id: str) -> bool:
         """Delete a campaign and all its leads"""
-        session = self.get_session()
-        try:
-            campaign = session.query(Campaign).filter_by(id=campaign_id).first()
-            if campaign:
-                # Delete all leads in this campaign
-                session.query(Lead).filter_by(campaign_id=campaign_id).delete()
-                # Delete the campaign
-                session.delete(campaign)
-                session.commit()
-                return True
-            return False
-        except Exception as e:
-            session.rollback()
-            raise e
-        finally:
-            session.close()
+        with self.session_scope() as session:
+            # The campaign row goes first, so the lead-count trigger has nothing left to update
+            if not session.execute(delete(Campaign).where(Campaign.id == campaign_id)).rowcount:
+                return False
+            # Delete all leads in this campaign
+            session.execute(delete(Lead).where(Lead.campaign_id == campaign_id))
+            session.commit()
+            _bump_data_version()
+            return True
+    
+    @_cached_analytics
+    def get_campaign_source_counts(self) -> List[tuple]:
+        """(campaign name, lead count) for every campaign with leads, largest first, via one JOIN"""
+        with self.read_scope() as session:
+            name = func.coalesce(Campaign.name, "Unnamed Campaign")
+            lead_count = func.count(Lead.id)
+            rows = session.query(name, lead_count).join(
+                Lead, Lead.campaign_id == Campaign.id
+            ).group_by(name).order_by(lead_count.desc()).all()
+            return [(campaign_name, count) for campaign_name, count in rows]
+    
+    @_cached_analytics
+    def get_campaign_stats(self) -> List[Dict]:
+        """Lead, emailed and replied counts per campaign (newest first), in one grouped query"""
+        with self.read_scope() as session:
+            rows = session.query(
+                Campaign.id,
+                Campaign.name,
+                func.count(Lead.id),
+                func.sum(case((Lead.status == "emailed", 1), else_=0)),
+                func.sum(case((Lead.has_replied == True, 1), else_=0))
+            ).outerjoin(Lead, Lead.campaign_id == Campaign.id).group_by(
+                Campaign.id
+            ).order_by(Campaign.created_at.desc()).all()
+            return [
+                {"id": campaign_id, "name": name, "total": total,
+                 "emailed": emailed or 0, "replied": replied or 0}
+                for campaign_id, name, total, emailed, replied in rows
+            ]
     
     def get_all_campaigns_with_lead_count(self) -> List[Campaign]:
-        """Get all campaigns with updated lead counts"""
-        campaigns = self.get_all_campaigns()
-        # Update lead counts for all campaigns
-        for campaign in campaigns:
-            self.update_campaign_lead_count(campaign.id)
-        return campaigns
+        """Get all campaigns; lead_count is kept current by triggers on leads"""
+        return self.get_all_campaigns()
+    
+    def acquire_lease(self, name: str, holder: str, ttl_seconds: float) -> bool:
+        """
+        Take (or renew) the lease name for ttl_seconds; False if another holder's is still live
+        Works across processes sharing the database, since SQLite serialises the writes
+        """
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=ttl_seconds)
+        with self.session_scope() as session:
+            created = session.execute(
+                sqlite_insert(SchedulerLease).values(name=name, holder=holder, expires_at=expires_at)
+                .on_conflict_do_nothing(index_elements=["name"])
+            ).rowcount
+            acquired = created or session.execute(
+                update(SchedulerLease).where(
+                    SchedulerLease.name == name,
+                    or_(SchedulerLease.expires_at <= now, SchedulerLease.holder == holder)
+                ).values(holder=holder, expires_at=expires_at)
+            ).rowcount
+            session.commit()
+            return bool(acquired)
+    
+    def release_lease(self, name: str, holder: str):
+        """Give up the lease name if holder still has it"""
+        with self.session_scope() as session:
+            session.execute(
+                update(SchedulerLease).where(
+                    SchedulerLease.name == name, SchedulerLease.holder == holder
+                ).values(expires_at=datetime.utcnow())
+            )
+            session.commit()
+
+
+# Shared instance: one engine, pool and schema check per process
+_database_instance = None
+_database_lock = threading.Lock()
 
+def get_database() -> Database:
+    """Get or create the process-wide Database (default path)"""
+    global _database_instance
+    if _database_instance is None:
+        with _database_lock:
+            if _database_instance is None:
+                _database_instance = Database()
+    return _database_instance
@@ -2,11 +2,64 @@
 AI Copywriter for generating personalized cold emails
 """
 from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, SystemMessage
-from typing import Dict, Optional
+from langchain_core.prompts import ChatPromptTemplate
+from typing import Dict, List, Optional, Tuple
+import orjson
 import config
 
 
+# Prompts are built once; each call only fills in the lead's fields
+_EMAIL_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are an expert B2B email copywriter specializing in personalized cold emails.
+        Write professional, concise, and engaging emails that:
+        - Are personalized to the recipient's company and role
+        - Mention specific details about their company when available
+        - Keep it under 100 words
+        - Have a clear, friendly tone
+        - Include a specific call-to-action
+        - Avoid being too salesy or pushy
+        Give each email a subject line that is personalized, under 60 characters ideally,
+        creates curiosity or highlights value, and avoids spammy words.
+        Return JSON: {{"subject": "<subject line>", "body": "<email body>"}}"""),
+    ("human", """Write a personalized cold email to {name} at {company_name}.
+
+Company Description: {description}
+
+Pain Points Identified: {pain_points}
+
+Recent News/Updates: {recent_news}
+
+{service_context}
+
+Start the email with "Hi {name}," and sign it with "- [Your Name]"
+
+Make it personalized, relevant, and compelling."""),
+])
+
+_SUBJECT_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are an expert at writing compelling email subject lines for B2B cold emails.
+        Create subject lines that:
+        - Are personalized and relevant to the recipient
+        - Are concise (under 60 characters ideally)
+        - Create curiosity or highlight value
+        - Avoid spammy words
+        - Are professional but engaging
+        Return ONLY the subject line, nothing else."""),
+    ("human", """Generate a compelling email subject line for a cold email to {name} at {company_name}.
+
+Company: {company_name}
+What they do: {description}
+
+{pain_points}
+
+{recent_news}
+
+{service_context}
+
+Create a personalized, engaging subject line that would make them want to open the email."""),
+])
+
+
 class AICopywriter:
     """Generates personalized cold emails based on lead information"""
     
@@ -18,6 +71,15 @@ class AICopywriter:
             temperature=0.8,  # Higher temperature for more creative emails
             api_key=config.OPENAI_API_KEY
         )
+        # Subject and body come back together as one JSON object, one round-trip per email
+        self.email_llm = ChatOpenAI(
+            model=config.LLM_MODEL,
+            temperature=0.8,
+            api_key=config.OPENAI_API_KEY,
+            model_kwargs={"response_format": {"type": "json_object"}}
+        )
+        self.email_chain = _EMAIL_PROMPT | self.email_llm
+        self.subject_chain = _SUBJECT_PROMPT | self.llm
     
     def generate_email(self, lead_info: Dict, user_context: Optional[str] = None) -> Dict[str, str]:
         """
@@ -30,70 +92,85 @@ class AICopywriter:
         Returns:
             Dictionary with 'subject' and 'body' keys
         """
-        name = lead_info.get("name", "there")
-        company_name = lead_info.get("company_name", "your company")
-        pain_points = lead_info.get("company_data", {}).get("pain_points", [])
-        description = lead_info.get("company_data", {}).get("description", "")
-        recent_news = lead_info.get("company_data", {}).get("recent_news", "")
-        
-        pain_points_text = ", ".join(pain_points[:3]) if pain_points else "industry challenges"
-        
-        # Generate email subject (with error handling)
         try:
-            subject = self.generate_subject(lead_info, user_context)
-            if not subject or not subject.strip():
-                # Fallback if subject generation returns empty
-                company_name = lead_info.get("company_name", "your company")
-                subject = f"Quick question about {company_name}"
-        except Exception as e:
-            print(f"Subject generation error, using fallback: {e}")
-            company_name = lead_info.get("company_name", "your company")
-            subject = f"Quick question about {company_name}"
-        
-        # Generate email body
-        system_prompt = """You are an expert B2B email copywriter specializing in personalized cold emails.
-        Write professional, concise, and engaging emails that:
-        - Are personalized to the recipient's company and role
-        - Mention specific details about their company when available
-        - Keep it under 100 words
-        - Have a clear, friendly tone
-        - Include a specific call-to-action
-        - Avoid being too salesy or pushy"""
-        
-        user_prompt = f"""Write a personalized cold email to {name} at {company_name}.
-
-Company Description: {description[:300]}
-
-Pain Points Identified: {pain_points_text}
-
-Recent News/Updates: {recent_news[:200] if recent_news else "None mentioned"}
-
-{f"Context about our service: {user_context}" if user_context else "Assume we offer relevant business solutions."}
-
-Start the email with "Hi {name}," and sign it with "- [Your Name]"
-
-Make it personalized, relevant, and compelling."""
-        
-        messages = [
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=user_prompt)
-        ]
-        
-        try:
-            response = self.llm.invoke(messages)
-            email_content = response.content.strip()
-            return {
-                "subject": subject,
-                "body": email_content
-            }
+            response = self.email_chain.invoke(self._email_inputs(lead_info, user_context))
+            subject, body = self._parse_email_response(response.content)
         except Exception as e:
             print(f"Email generation error: {e}")
+            subject, body = "", None
+        return self._finish_email(lead_info, subject, body)
+    
+    def generate_emails_batch(self, leads: List[Dict], user_context: Optional[str] = None,
+                              concurrency: Optional[int] = None) -> List[Dict[str, str]]:
+        """
+        Generate emails for many leads at once
+        All prompts go out as one LLM batch, at most concurrency requests in flight
+        (default EMAIL_GENERATION_CONCURRENCY), one subject+body request per lead;
+        returns one {'subject', 'body'} dict per lead, in order
+        """
+        if not leads:
+            return []
+        responses = self.email_chain.batch(
+            [self._email_inputs(lead, user_context) for lead in leads],
+            config={"max_concurrency": concurrency or config.EMAIL_GENERATION_CONCURRENCY},
+            return_exceptions=True
+        )
+        
+        emails = []
+        for lead_info, response in zip(leads, responses):
+            subject, body = "", None
+            if isinstance(response, Exception):
+                print(f"Email generation error: {response}")
+            else:
+                try:
+                    subject, body = self._parse_email_response(response.content)
+                except Exception as e:
+                    print(f"Email generation error: {e}")
+            emails.append(self._finish_email(lead_info, subject, body))
+        return emails
+    
+    def _finish_email(self, lead_info: Dict, subject: str, body: Optional[str]) -> Dict[str, str]:
+        """Fill in fallbacks for a failed subject or body"""
+        company_name = lead_info.get("company_name", "your company")
+        if body is None:
             # Return a fallback email
-            fallback = self._generate_fallback_email(name, company_name, description)
+            name = lead_info.get("name", "there")
+            description = lead_info.get("company_data", {}).get("description", "")
             return {
                 "subject": f"Quick question about {company_name}",
-                "body": fallback
+                "body": self._generate_fallback_email(name, company_name, description)
             }
+        if not subject or not subject.strip():
+            # Fallback if subject generation returns empty
+            subject = f"Quick question about {company_name}"
+        return {
+            "subject": subject,
+            "body": body
+        }
+    
+    def _email_inputs(self, lead_info: Dict, user_context: Optional[str] = None) -> Dict[str, str]:
+        """Fill-ins for the email prompt (subject line and body, answered as JSON)"""
+        company_data = lead_info.get("company_data", {})
+        pain_points = company_data.get("pain_points", [])
+        recent_news = company_data.get("recent_news", "")
+        return {
+            "name": lead_info.get("name", "there"),
+            "company_name": lead_info.get("company_name", "your company"),
+            "description": company_data.get("description", "")[:300],
+            "pain_points": ", ".join(pain_points[:3]) if pain_points else "industry challenges",
+            "recent_news": recent_news[:200] if recent_news else "None mentioned",
+            "service_context": (f"Context about our service: {user_context}" if user_context
+                                else "Assume we offer relevant business solutions."),
+        }
+    
+    def _parse_email_response(self, content: str) -> Tuple[str, Optional[str]]:
+        """(subject, body) from a JSON reply; body is None if the reply has none"""
+        data = orjson.loads(content)
+        subject = data.get("subject")
+        body = data.get("body")
+        subject = self._clean_subject(subject) if isinstance(subject, str) else ""
+        body = body.strip() if isinstance(body, str) and body.strip() else None
+        return subject, body
     
     def generate_subject(self, lead_info: Dict, user_context: Optional[str] = None) -> str:
         """
@@ -106,53 +183,40 @@ Make it personalized, relevant, and compelling."""
         Returns:
             Generated subject line
         """
-        name = lead_info.get("name", "")
         company_name = lead_info.get("company_name", "your company")
-        description = lead_info.get("company_data", {}).get("description", "")
-        pain_points = lead_info.get("company_data", {}).get("pain_points", [])
-        recent_news = lead_info.get("company_data", {}).get("recent_news", "")
-        
-        system_prompt = """You are an expert at writing compelling email subject lines for B2B cold emails.
-        Create subject lines that:
-        - Are personalized and relevant to the recipient
-        - Are concise (under 60 characters ideally)
-        - Create curiosity or highlight value
-        - Avoid spammy words
-        - Are professional but engaging
-        Return ONLY the subject line, nothing else."""
-        
-        user_prompt = f"""Generate a compelling email subject line for a cold email to {name} at {company_name}.
-
-Company: {company_name}
-What they do: {description[:200] if description else "Business company"}
-
-{f"Pain points: {', '.join(pain_points[:2])}" if pain_points else ""}
-
-{f"Recent news: {recent_news[:150]}" if recent_news else ""}
-
-{f"Our service context: {user_context}" if user_context else ""}
-
-Create a personalized, engaging subject line that would make them want to open the email."""
-        
-        messages = [
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=user_prompt)
-        ]
-        
         try:
-            response = self.llm.invoke(messages)
-            subject = response.content.strip()
-            # Clean up subject (remove quotes if present)
-            subject = subject.strip('"').strip("'").strip()
-            # Limit length
-            if len(subject) > 100:
-                subject = subject[:97] + "..."
-            return subject
+            response = self.subject_chain.invoke(self._subject_inputs(lead_info, user_context))
+            return self._clean_subject(response.content)
         except Exception as e:
             print(f"Subject generation error: {e}")
             # Fallback subject
             return f"Quick question about {company_name}"
     
+    def _subject_inputs(self, lead_info: Dict, user_context: Optional[str] = None) -> Dict[str, str]:
+        """Fill-ins for the subject-line prompt"""
+        company_data = lead_info.get("company_data", {})
+        description = company_data.get("description", "")
+        pain_points = company_data.get("pain_points", [])
+        recent_news = company_data.get("recent_news", "")
+        return {
+            "name": lead_info.get("name", ""),
+            "company_name": lead_info.get("company_name", "your company"),
+            "description": description[:200] if description else "Business company",
+            "pain_points": f"Pain points: {', '.join(pain_points[:2])}" if pain_points else "",
+            "recent_news": f"Recent news: {recent_news[:150]}" if recent_news else "",
+            "service_context": f"Our service context: {user_context}" if user_context else "",
+        }
+    
+    def _clean_subject(self, subject: str) -> str:
+        """Strip quotes and cap the length of a generated subject"""
+        subject = subject.strip()
+        # Clean up subject (remove quotes if present)
+        subject = subject.strip('"').strip("'").strip()
+        # Limit length
+        if len(subject) > 100:
+            subject = subject[:97] + "..."
+        return subject
+    
     def _generate_fallback_email(self, name: str, company_name: str, description: str) -> str:
         """Generate a simple fallback email if LLM fails"""
         return f"""Hi {name},
@@ -2,35 +2,212 @@
 Email sending functionality using SMTP
 """
 import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from datetime import datetime
-from typing import Optional, Dict
+from typing import Iterator, List, Optional, Dict, Tuple
 import config
-from database import Database
+from database import Database, get_database
 
 
 class EmailSender:
     """Handles sending emails via SMTP"""
     
-    def __init__(self):
+    def __init__(self, db: Optional[Database] = None):
         self.smtp_server = config.SMTP_SERVER
         self.smtp_port = config.SMTP_PORT
         self.username = config.SMTP_USERNAME
         self.password = config.SMTP_PASSWORD
-        self.email_from = config.EMAIL_FROM or config.SMTP_USERNAME
-        self.db = Database()
+        self.email_from = config.SMTP_SENDER
+        self.configured = config.SMTP_CONFIGURED
+        self.db = db or get_database()
+        # Idle logged-in connections, newest last: (connection, last used monotonic time)
+        self._pool: List[tuple] = []
+        self._pool_lock = threading.Lock()
+    
+    def _connect(self) -> smtplib.SMTP:
+        """Open and log in to an SMTP connection"""
+        if self.smtp_port == 465:
+            # SSL connection
+            server = smtplib.SMTP_SSL(self.smtp_server, self.smtp_port, timeout=config.SMTP_TIMEOUT_SECONDS)
+        else:
+            # TLS connection (default)
+            server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=config.SMTP_TIMEOUT_SECONDS)
+            server.starttls()
+        
+        # Login
+        server.login(self.username, self.password)
+        return server
+    
+    def _acquire(self) -> smtplib.SMTP:
+        """Reuse a pooled connection that is still fresh and answers NOOP, else log in anew"""
+        while True:
+            with self._pool_lock:
+                entry = self._pool.pop() if self._pool else None
+            if entry is None:
+                return self._connect()
+            server, last_used = entry
+            if time.monotonic() - last_used < config.SMTP_IDLE_TIMEOUT_SECONDS and _is_alive(server):
+                return server
+            _close_quietly(server)
+    
+    def _release(self, server: smtplib.SMTP):
+        """Return a healthy connection to the pool, or close it if the pool is full"""
+        with self._pool_lock:
+            if len(self._pool) < config.SMTP_POOL_SIZE:
+                self._pool.append((server, time.monotonic()))
+                return
+        _close_quietly(server)
+    
+    def close(self):
+        """Log out of every pooled connection (call on shutdown)"""
+        with self._pool_lock:
+            pool, self._pool = self._pool, []
+        for server, _ in pool:
+            _close_quietly(server)
+    
+    @contextmanager
+    def session(self) -> Iterator[Optional[smtplib.SMTP]]:
+        """
+        Keep one logged-in SMTP connection (borrowed from the pool) for a batch of sends
+        Pass the yielded connection to send_email/send_lead_email as smtp=...
+        Yields None if the connection can't be opened, so each send connects
+        on its own and reports its own error
+        """
+        server = None
+        if self.configured:
+            try:
+                server = self._acquire()
+            except Exception as e:
+                print(f"⚠️ Could not open SMTP session, sending one connection per email: {e}")
+        try:
+            yield server
+        finally:
+            if server is not None:
+                self._release(server)
+    
+    def _reconnect(self, server: smtplib.SMTP):
+        """Reopen and log in a connection the server dropped, keeping the same object"""
+        server.close()
+        # Forget the old EHLO, as quit() would, so STARTTLS and AUTH negotiate afresh
+        server.ehlo_resp = server.helo_resp = None
+        server.esmtp_features = {}
+        server.does_esmtp = False
+        server.connect(self.smtp_server, self.smtp_port)
+        if self.smtp_port != 465:
+            server.starttls()
+        server.login(self.username, self.password)
+    
+    def send_batch(self, messages: List[Tuple[str, str, str, str]],
+                   is_followup: bool = False, concurrency: int = 1,
+                   max_failure_ratio: Optional[float] = None,
+                   stop: Optional[threading.Event] = None) -> List[Dict]:
+        """
+        Send (to_email, subject, body, lead_email) messages
+        Messages are split across up to concurrency SMTP connections, each sending its
+        share in its own thread and recording its sent leads as it goes;
+        returns one send_email result per message, in order
+        With max_failure_ratio, a connection stops once more than that share of its
+        messages has failed; the rest come back failed with 'skipped': True
+        Setting stop does the same for every connection before its next message
+        """
+        if not messages:
+            return []
+        
+        def send_shard(shard: List[int]) -> List[Tuple[int, Dict]]:
+            max_failures = None if max_failure_ratio is None else int(len(shard) * max_failure_ratio)
+            with self.session() as smtp:
+                results = self._send_and_record(
+                    [messages[index] for index in shard], is_followup, smtp, max_failures, stop
+                )
+            return list(zip(shard, results))
+        
+        workers = max(1, min(concurrency, len(messages)))
+        shards = [list(range(i, len(messages), workers)) for i in range(workers)]
+        if workers == 1:
+            sent = send_shard(shards[0])
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="smtp-send") as pool:
+                sent = [item for shard in pool.map(send_shard, shards) for item in shard]
+        return [result for _, result in sorted(sent, key=lambda item: item[0])]
+    
+    def send_campaign(self, leads: List[Tuple[str, str, str]],
+                      smtp: Optional[smtplib.SMTP] = None) -> List[Dict]:
+        """
+        Send (lead_email, subject, body) emails over one SMTP connection (smtp, or a session)
+        and mark the delivered leads as emailed, a few at a time
+        Returns one send_email result per lead, in order
+        """
+        messages = [
+            (lead_email, subject or _default_subject(body), body, lead_email)
+            for lead_email, subject, body in leads
+        ]
+        if smtp is not None:
+            return self._send_and_record(messages, False, smtp)
+        with self.session() as session_smtp:
+            return self._send_and_record(messages, False, session_smtp)
+    
+    def _send_and_record(self, messages: List[Tuple[str, str, str, str]], is_followup: bool,
+                         smtp: Optional[smtplib.SMTP], max_failures: Optional[int] = None,
+                         stop: Optional[threading.Event] = None) -> List[Dict]:
+        """
+        Send messages in turn, recording the delivered ones with one status update per
+        SEND_RECORD_BATCH_SIZE sends (and for the remainder when sending ends)
+        Stops sending once more than max_failures have failed (the server is likely down or
+        rate-limiting us) or stop is set; the unsent messages get skipped results
+        """
+        status = "followed_up" if is_followup else "emailed"
+        results = []
+        delivered: Dict[str, str] = {}
+        failures = 0
+        try:
+            for to_email, subject, body, lead_email in messages:
+                if stop is not None and stop.is_set():
+                    results.append({
+                        "success": False,
+                        "skipped": True,
+                        "message": f"⏭️ Not sent to {to_email}: batch stopped"
+                    })
+                    continue
+                if max_failures is not None and failures > max_failures:
+                    results.append({
+                        "success": False,
+                        "skipped": True,
+                        "message": f"⏭️ Not sent to {to_email}: too many failed sends in this batch"
+                    })
+                    continue
+                result = self.send_email(to_email, subject, body, lead_email,
+                                         is_followup=is_followup, smtp=smtp, record_status=False)
+                if result["success"]:
+                    delivered[lead_email] = body
+                    if len(delivered) >= config.SEND_RECORD_BATCH_SIZE:
+                        self.db.bulk_update_lead_status(status, delivered)
+                        delivered = {}
+                else:
+                    failures += 1
+                results.append(result)
+        finally:
+            # Also runs if sending raised, so delivered leads are never left unrecorded
+            if delivered:
+                self.db.bulk_update_lead_status(status, delivered)
+        return results
     
     def send_email(self, to_email: str, subject: str, body: str, 
-                   lead_email: str, is_followup: bool = False) -> Dict:
+                   lead_email: str, is_followup: bool = False,
+                   smtp: Optional[smtplib.SMTP] = None, record_status: bool = True) -> Dict:
         """
         Send an email via SMTP
+        Uses the given smtp connection (see session()) or one from the pool
+        With record_status=False the caller updates the lead's status itself
         
         Returns:
             Dict with 'success' (bool) and 'message' (str)
         """
         # Validation checks
-        if not self.username or not self.password:
+        if not self.configured:
             return {
                 "success": False,
                 "message": "❌ SMTP credentials not configured. Please set SMTP_USERNAME and SMTP_PASSWORD in your .env file."
@@ -59,26 +236,27 @@ class EmailSender:
             msg.attach(MIMEText(body, 'plain', 'utf-8'))
             
             # Connect to SMTP server and send
-            if self.smtp_port == 465:
-                # SSL connection
-                server = smtplib.SMTP_SSL(self.smtp_server, self.smtp_port, timeout=30)
+            if smtp is not None:
+                try:
+                    smtp.send_message(msg)
+                except smtplib.SMTPServerDisconnected:
+                    # Idle sessions get dropped by the server; log in again once and retry
+                    self._reconnect(smtp)
+                    smtp.send_message(msg)
             else:
-                # TLS connection (default)
-                server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=30)
-                server.starttls()
-            
-            # Login
-            server.login(self.username, self.password)
-            
-            # Send email
-            server.send_message(msg)
-            
-            # Close connection
-            server.quit()
+                server = self._acquire()
+                try:
+                    server.send_message(msg)
+                except Exception:
+                    # The connection may be in an unknown state, so don't pool it
+                    _close_quietly(server)
+                    raise
+                self._release(server)
             
             # Update database
-            status = "followed_up" if is_followup else "emailed"
-            self.db.update_lead_status(lead_email, status, body)
+            if record_status:
+                status = "followed_up" if is_followup else "emailed"
+                self.db.update_lead_status(lead_email, status, body)
             
             return {
                 "success": True,
@@ -135,53 +313,78 @@ class EmailSender:
             }
     
     def send_lead_email(self, lead_email: str, email_content: str, 
-                       subject: Optional[str] = None) -> Dict:
+                       subject: Optional[str] = None,
+                       smtp: Optional[smtplib.SMTP] = None) -> Dict:
         """Send email to a lead"""
-        if not subject:
-            # Try to extract subject from first line or use default
-            first_line = email_content.split('\n')[0].strip()
-            if len(first_line) < 100 and not first_line.startswith('Hi'):
-                subject = first_line
-            else:
-                subject = "Quick question about your business"
-        
         return self.send_email(
             to_email=lead_email,
-            subject=subject,
+            subject=subject or _default_subject(email_content),
             body=email_content,
             lead_email=lead_email,
-            is_followup=False
+            is_followup=False,
+            smtp=smtp
         )
     
-    def send_followup_email(self, lead_email: str, original_email: str) -> Dict:
-        """Send a follow-up email to a lead"""
-        # Try to extract a better subject from original email
-        if isinstance(original_email, str) and len(original_email) > 50:
-            # If original_email is the full email content, try to get subject from first line
-            first_line = original_email.split('\n')[0].strip()
-            if len(first_line) < 100:
-                subject_base = first_line
-            else:
-                subject_base = original_email[:50]
+    def send_followup_email(self, lead_email: str, original_email: str,
+                            smtp: Optional[smtplib.SMTP] = None) -> Dict:
+        """Send a follow-up email to a lead (over smtp if given, see session())"""
+        to_email, subject, body, _ = followup_message(lead_email, original_email)
+        return self.send_email(
+            to_email=to_email,
+            subject=subject,
+            body=body,
+            lead_email=lead_email,
+            is_followup=True,
+            smtp=smtp
+        )
+
+
+def followup_message(lead_email: str, original_email: str) -> Tuple[str, str, str, str]:
+    """The (to_email, subject, body, lead_email) follow-up to a lead, for send_batch"""
+    # Try to extract a better subject from original email
+    if isinstance(original_email, str) and len(original_email) > 50:
+        # If original_email is the full email content, try to get subject from first line
+        first_line = original_email.split('\n')[0].strip()
+        if len(first_line) < 100:
+            subject_base = first_line
         else:
-            subject_base = str(original_email)[:50]
-        
-        followup_subject = f"Re: {subject_base}"
-        
-        # More professional follow-up email
-        followup_body = f"""Hi there,
+            subject_base = original_email[:50]
+    else:
+        subject_base = str(original_email)[:50]
+    
+    followup_subject = f"Re: {subject_base}"
+    
+    # More professional follow-up email
+    followup_body = """Hi there,
 
 I wanted to follow up on my previous email. I'd love to hear your thoughts or answer any questions you might have.
 
 Looking forward to hearing from you!
 
 Best regards"""
-        
-        return self.send_email(
-            to_email=lead_email,
-            subject=followup_subject,
-            body=followup_body,
-            lead_email=lead_email,
-            is_followup=True
-        )
+    
+    return lead_email, followup_subject, followup_body, lead_email
+
+
+def _default_subject(email_content: str) -> str:
+    """Subject for an email sent without one: its first line if short, else a generic one"""
+    first_line = email_content.split('\n')[0].strip()
+    if len(first_line) < 100 and not first_line.startswith('Hi'):
+        return first_line
+    return "Quick question about your business"
+
+
+def _is_alive(server: smtplib.SMTP) -> bool:
+    """Whether an open SMTP connection still answers"""
+    try:
+        return server.noop()[0] == 250
+    except (smtplib.SMTPException, OSError):
+        return False
+
 
+def _close_quietly(server: smtplib.SMTP):
+    """QUIT an SMTP connection, dropping it if the server is already gone"""
+    try:
+        server.quit()
+    except (smtplib.SMTPException, OSError):
+        server.close()
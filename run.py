@@ -17,13 +17,27 @@ if __name__ == "__main__":
     print(f"📍 Health Check: http://localhost:{port}/health")
     print("\nPress Ctrl+C to stop the server.\n")
     
+    production = os.getenv("ENVIRONMENT") == "production"
+    if production:
+        # Several worker processes (reload only works with one); the scheduler lock keeps
+        # follow-ups to a single worker
+        server_options = {
+            "workers": int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 2)),
+            "backlog": 2048,  # Room for bursts of dashboard polling
+            "access_log": False,
+        }
+    else:
+        server_options = {"reload": True}
+    
     try:
         uvicorn.run(
             "backend:app",
             host="0.0.0.0",
             port=port,
-            reload=os.getenv("ENVIRONMENT") != "production",  # Disable reload in production
-            log_level="info"
+            loop="uvloop",  # libuv event loop and C HTTP parser, from uvicorn[standard]
+            http="httptools",
+            log_level="info",
+            **server_options
         )
     except KeyboardInterrupt:
         print("\n\n👋 Shutting down... Goodbye!")
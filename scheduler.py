@@ -2,22 +2,41 @@
 Follow-up email scheduler
 Checks for leads that need follow-up emails and sends them
 """
+import os
+import socket
 import threading
-import time
-from datetime import datetime, timedelta
-from database import Database, Lead
-from email_sender import EmailSender
+import traceback
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:  # Windows: no advisory file locks
+    FCNTL_AVAILABLE = False
+from database import get_database
+from email_sender import EmailSender, followup_message
 import config
 
+_LEASE_NAME = "followups"
+
 
 class FollowUpScheduler:
     """Manages scheduled follow-up emails"""
     
     def __init__(self):
-        self.db = Database()
-        self.email_sender = EmailSender()
+        self.db = get_database()
+        self.email_sender = EmailSender(db=self.db)
         self.running = False
         self.thread = None
+        # Held while a check runs, so a manual check can't overlap the periodic one
+        self._process_lock = threading.Lock()
+        # Set by stop() to cut the loop's wait short
+        self._wake = threading.Event()
+        # Cycles in a row cut short by too many failed sends; the loop backs off exponentially
+        self._aborted_cycles = 0
+        # Identifies this scheduler in the follow-up lease shared through the database
+        self._lease_holder = f"{socket.gethostname()}:{os.getpid()}:{id(self)}"
     
     def start(self, check_interval_minutes: int = 15):
         """Start the scheduler in a background thread"""
@@ -27,6 +46,7 @@ class FollowUpScheduler:
         
         self.running = True
         self.check_interval = check_interval_minutes
+        self._wake.clear()
         self.thread = threading.Thread(
             target=self._run_scheduler,
             args=(check_interval_minutes,),
@@ -38,25 +58,83 @@ class FollowUpScheduler:
     def stop(self):
         """Stop the scheduler"""
         self.running = False
+        self._wake.set()
         if self.thread:
             self.thread.join(timeout=5)
         print("Follow-up scheduler stopped")
     
     def _run_scheduler(self, check_interval_minutes: int):
         """Main scheduler loop"""
-        import traceback
+        interval = check_interval_minutes * 60
+        idle_delay = interval
         while self.running:
+            delay = interval
             try:
                 self.process_followups()
+                next_due = self.db.get_next_follow_up_date()
+                if next_due is None:
+                    # Nothing upcoming: back off, since new follow-ups are FOLLOW_UP_DAYS away
+                    idle_delay = min(idle_delay * 2, interval * config.SCHEDULER_MAX_IDLE_FACTOR)
+                    delay = idle_delay
+                else:
+                    idle_delay = interval
+                    until_due = (next_due - datetime.utcnow()).total_seconds()
+                    delay = max(config.SCHEDULER_MIN_DELAY_SECONDS, min(interval, until_due))
+                if self._aborted_cycles:
+                    # SMTP looked down; the unsent leads are still due, so retry later, not sooner
+                    backoff = interval * 2 ** (self._aborted_cycles - 1)
+                    delay = max(delay, min(backoff, interval * config.SCHEDULER_MAX_IDLE_FACTOR))
             except Exception as e:
                 print(f"❌ Scheduler error: {e}")
                 traceback.print_exc()
             
-            # Sleep for check interval
-            time.sleep(check_interval_minutes * 60)
+            # Wait until the next follow-up is due, or until stop()
+            self._wake.wait(timeout=delay)
+            self._wake.clear()
     
     def process_followups(self):
-        """Process leads that need follow-up emails"""
+        """Process leads that need follow-up emails (skipped if a check is already running)"""
+        if not self._process_lock.acquire(blocking=False):
+            print("⏭️ Follow-up check already in progress, skipping")
+            return
+        try:
+            # Other processes on the same database (replicas, reloaders) may run a scheduler too
+            if not self.db.acquire_lease(_LEASE_NAME, self._lease_holder, config.SCHEDULER_LEASE_SECONDS):
+                print("⏭️ Follow-up check running in another process, skipping")
+                return
+            # Renew the lease while the cycle runs, however long its batch takes
+            cycle_done = threading.Event()
+            lease_lost = threading.Event()
+            renewer = threading.Thread(
+                target=self._renew_lease, args=(cycle_done, lease_lost),
+                name="followup-lease", daemon=True
+            )
+            renewer.start()
+            try:
+                self._process_followups(lease_lost)
+            finally:
+                cycle_done.set()
+                renewer.join()
+                self.db.release_lease(_LEASE_NAME, self._lease_holder)
+        finally:
+            self._process_lock.release()
+    
+    def _renew_lease(self, cycle_done: threading.Event, lease_lost: threading.Event):
+        """Extend the follow-up lease every third of its lifetime until cycle_done is set"""
+        while not cycle_done.wait(config.SCHEDULER_LEASE_SECONDS / 3):
+            try:
+                renewed = self.db.acquire_lease(_LEASE_NAME, self._lease_holder, config.SCHEDULER_LEASE_SECONDS)
+            except Exception as e:
+                print(f"⚠️ Could not renew the follow-up lease: {e}")
+                continue  # Still ours until it expires; try again next time
+            if not renewed:
+                # Another process took it over: stop before sending what it will send too
+                print("⚠️ Follow-up lease taken over by another process, stopping this cycle")
+                lease_lost.set()
+                return
+    
+    def _process_followups(self, lease_lost: Optional[threading.Event] = None):
+        """Send any due follow-ups; callers hold _process_lock (and the lease, see lease_lost)"""
         try:
             leads_needing_followup = self.db.get_leads_needing_followup()
             
@@ -64,57 +142,61 @@ class FollowUpScheduler:
                 # Silent check - no leads need follow-up
                 return
             
-            print(f"📧 Checking {len(leads_needing_followup)} lead(s) for follow-up emails...")
-            
-            for lead in leads_needing_followup:
-                try:
-                    # Double-check if enough time has passed
-                    if lead.follow_up_date and lead.follow_up_date <= datetime.utcnow():
-                        if not lead.has_replied:
-                            # Send follow-up email
-                            original_email = lead.email_content or "Previous message"
-                            
-                            print(f"📨 Sending follow-up email to {lead.email} (follow-up date: {lead.follow_up_date})")
-                            
-                            result = self.email_sender.send_followup_email(
-                                lead.email,
-                                original_email
-                            )
-                            
-                            if result["success"]:
-                                print(f"✅ Follow-up email sent successfully to {lead.email}")
-                                # Clear follow-up date to prevent sending multiple follow-ups
-                                session = self.db.get_session()
-                                try:
-                                    updated_lead = session.query(Lead).filter_by(email=lead.email).first()
-                                    if updated_lead:
-                                        updated_lead.follow_up_date = None  # Clear to prevent re-sending
-                                        session.commit()
-                                        print(f"   ✓ Follow-up date cleared for {lead.email}")
-                                except Exception as e:
-                                    print(f"⚠️ Warning: Could not clear follow-up date for {lead.email}: {e}")
-                                    session.rollback()
-                                finally:
-                                    session.close()
-                            else:
-                                print(f"❌ Failed to send follow-up to {lead.email}: {result.get('message', 'Unknown error')}")
-                        else:
-                            print(f"⏭️ Skipping {lead.email} - lead has already replied")
-                    else:
-                        # Follow-up date hasn't been reached yet
-                        if lead.follow_up_date:
-                            days_remaining = (lead.follow_up_date - datetime.utcnow()).days
-                            if days_remaining > 0:
-                                print(f"⏳ {lead.email} - follow-up scheduled in {days_remaining} day(s)")
-                except Exception as e:
-                    import traceback
-                    print(f"❌ Error processing follow-up for {lead.email}: {e}")
-                    traceback.print_exc()
+            sent_emails, skipped = self._send_followups(leads_needing_followup, lease_lost)
+            due = len(leads_needing_followup)
+            failed = due - len(sent_emails) - skipped
+            print(f"📧 Follow-up cycle: {due} due, {len(sent_emails)} sent, {failed} failed")
+            if skipped and lease_lost is not None and lease_lost.is_set():
+                print(f"⏭️ {skipped} follow-up(s) left to the process now holding the lease")
+            elif skipped:
+                self._aborted_cycles += 1
+                print(f"⚠️ Stopped early after too many failed sends; {skipped} follow-up(s) left for a later retry")
+            else:
+                self._aborted_cycles = 0
         except Exception as e:
-            import traceback
             print(f"❌ Error in process_followups: {e}")
             traceback.print_exc()
     
+    def _send_followups(self, leads_needing_followup,
+                        lease_lost: Optional[threading.Event] = None) -> Tuple[List[str], int]:
+        """
+        Send follow-ups to the given leads; returns the emails sent and how many were skipped
+        Sends overlap across up to FOLLOWUP_SEND_WORKERS SMTP connections, each logged in once;
+        a large cycle stops once more than FOLLOWUP_ABORT_FAILURE_RATIO of its sends fail
+        """
+        messages = [
+            followup_message(lead.email, lead.email_content or "Previous message")
+            for lead in leads_needing_followup
+        ]
+        
+        max_failure_ratio = None
+        if len(messages) >= config.FOLLOWUP_ABORT_MIN_BATCH:
+            max_failure_ratio = config.FOLLOWUP_ABORT_FAILURE_RATIO
+        
+        try:
+            # send_batch marks the delivered leads followed_up (clearing their follow-up date)
+            # in one update per connection
+            results = self.email_sender.send_batch(
+                messages, is_followup=True, concurrency=config.FOLLOWUP_SEND_WORKERS,
+                max_failure_ratio=max_failure_ratio, stop=lease_lost
+            )
+        except Exception as e:
+            print(f"❌ Error sending follow-ups: {e}")
+            traceback.print_exc()
+            return [], 0
+        
+        sent_emails = []
+        skipped = 0
+        for (_, _, _, lead_email), result in zip(messages, results):
+            if result["success"]:
+                sent_emails.append(lead_email)
+            elif result.get("skipped"):
+                skipped += 1
+            else:
+                # Only failures are worth a line each; the cycle summary covers the rest
+                print(f"❌ Failed to send follow-up to {lead_email}: {result.get('message', 'Unknown error')}")
+        return sent_emails, skipped
+    
     def check_followups_now(self):
         """Manually trigger follow-up check (useful for Streamlit)"""
         self.process_followups()
@@ -122,11 +204,37 @@ class FollowUpScheduler:
 
 # Global scheduler instance
 _scheduler_instance = None
+_scheduler_lock = threading.Lock()
 
 def get_scheduler() -> FollowUpScheduler:
     """Get or create the global scheduler instance"""
     global _scheduler_instance
     if _scheduler_instance is None:
-        _scheduler_instance = FollowUpScheduler()
+        with _scheduler_lock:
+            if _scheduler_instance is None:
+                _scheduler_instance = FollowUpScheduler()
     return _scheduler_instance
 
+
+
+_lock_file = None
+
+def acquire_scheduler_lock(path: str = config.SCHEDULER_LOCK_PATH) -> bool:
+    """
+    Try to become the one process that runs the scheduler
+    Holds an exclusive lock on path for the life of the process, so with several
+    uvicorn workers only the first one to start gets True
+    """
+    global _lock_file
+    if _lock_file is not None:
+        return True
+    if not FCNTL_AVAILABLE:
+        return True
+    lock_file = open(path, "a")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    _lock_file = lock_file
+    return True
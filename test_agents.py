@@ -0,0 +1,51 @@
+"""
+Smoke test: every agent can be constructed
+Catches missing imports and broken __init__ wiring without calling any API
+Run with: python -m unittest test_agents
+"""
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+try:
+    import config
+    import agents
+    AGENTS_IMPORTABLE = True
+except ImportError:  # Runtime deps (dotenv, langchain, bs4, ...) not installed
+    AGENTS_IMPORTABLE = False
+
+
+@unittest.skipUnless(AGENTS_IMPORTABLE, "agent dependencies are not installed")
+class AgentConstructionTest(unittest.TestCase):
+    """Build each agent with a dummy OpenAI key; construction makes no network calls"""
+
+    def setUp(self):
+        # The caches and HTTP cache are SQLite files relative to the working directory
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp.name)
+        patcher = mock.patch.object(config, "OPENAI_API_KEY", "sk-test-dummy")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def test_discovery_agent(self):
+        self.assertIsNotNone(agents.LeadDiscoveryAgent())
+
+    def test_enrichment_agent(self):
+        self.assertIsNotNone(agents.LeadEnrichmentAgent())
+
+    def test_validator_agent(self):
+        self.assertIsNotNone(agents.LeadValidatorAgent())
+
+    def test_pipeline(self):
+        pipeline = agents.LeadPipeline(agents.LeadEnrichmentAgent(), agents.LeadValidatorAgent())
+        self.assertEqual(pipeline.run([], "coffee shops"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
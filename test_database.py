@@ -0,0 +1,84 @@
+"""
+Tests for database.py: the scheduler lease and in-memory databases
+Run with: python -m unittest test_database
+"""
+import os
+import tempfile
+import threading
+import unittest
+
+try:
+    from sqlalchemy import text
+    from database import Database
+    DATABASE_IMPORTABLE = True
+except ImportError:  # Runtime deps (sqlalchemy, dotenv, ...) not installed
+    DATABASE_IMPORTABLE = False
+
+
+@unittest.skipUnless(DATABASE_IMPORTABLE, "database dependencies are not installed")
+class SchedulerLeaseTest(unittest.TestCase):
+    """Only one holder at a time may run a follow-up cycle"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self._tmp.name, "leads.db"))
+
+    def tearDown(self):
+        self.db.engine.dispose()
+        self.db.read_engine.dispose()
+        self._tmp.cleanup()
+
+    def test_live_lease_is_not_taken_over(self):
+        self.assertTrue(self.db.acquire_lease("followups", "worker-a", 60))
+        self.assertFalse(self.db.acquire_lease("followups", "worker-b", 60))
+
+    def test_holder_can_renew_its_lease(self):
+        self.assertTrue(self.db.acquire_lease("followups", "worker-a", 60))
+        self.assertTrue(self.db.acquire_lease("followups", "worker-a", 60))
+        self.assertFalse(self.db.acquire_lease("followups", "worker-b", 60))
+
+    def test_expired_lease_is_taken_over(self):
+        # A negative TTL leaves the lease already expired, as if its holder had crashed
+        self.assertTrue(self.db.acquire_lease("followups", "worker-a", -1))
+        self.assertTrue(self.db.acquire_lease("followups", "worker-b", 60))
+        # The old holder can't renew a lease someone else now holds
+        self.assertFalse(self.db.acquire_lease("followups", "worker-a", 60))
+
+    def test_release_frees_the_lease(self):
+        self.assertTrue(self.db.acquire_lease("followups", "worker-a", 60))
+        self.db.release_lease("followups", "worker-a")
+        self.assertTrue(self.db.acquire_lease("followups", "worker-b", 60))
+
+    def test_release_by_another_holder_is_ignored(self):
+        self.assertTrue(self.db.acquire_lease("followups", "worker-a", 60))
+        self.db.release_lease("followups", "worker-b")
+        self.assertFalse(self.db.acquire_lease("followups", "worker-b", 60))
+
+    def test_leases_are_independent_by_name(self):
+        self.assertTrue(self.db.acquire_lease("followups", "worker-a", 60))
+        self.assertTrue(self.db.acquire_lease("other-job", "worker-b", 60))
+
+
+
+@unittest.skipUnless(DATABASE_IMPORTABLE, "database dependencies are not installed")
+class InMemoryDatabaseTest(unittest.TestCase):
+    """An in-memory database is one database, whichever thread or connection uses it"""
+
+    def test_other_threads_see_the_schema_and_rows(self):
+        db = Database(":memory:")
+        db.add_lead("owner@example.com", company_name="Example")
+        found = []
+        worker = threading.Thread(target=lambda: found.append(db.get_lead_by_email("owner@example.com")))
+        worker.start()
+        worker.join()
+        self.assertIsNotNone(found[0])
+
+    def test_concurrent_sessions_share_one_database(self):
+        db = Database(":memory:")
+        with db.session_scope() as first, db.session_scope() as second:
+            first.execute(text("SELECT 1 FROM leads"))
+            second.execute(text("SELECT 1 FROM leads"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,21 +7,41 @@ import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
+
+def _build_test_message() -> bytes:
+    """The test email to yourself, encoded once so repeated checks just resend the bytes"""
+    msg = MIMEMultipart()
+    msg['From'] = config.SMTP_SENDER
+    msg['To'] = config.SMTP_USERNAME
+    msg['Subject'] = "Test Email from Lead Generation System"
+    msg.attach(MIMEText("This is a test email from your Lead Generation System. If you received this, your SMTP configuration is working correctly!", 'plain', 'utf-8'))
+    return msg.as_bytes()
+
+
+_TEST_MSG_BYTES = _build_test_message()
+
+
 def test_smtp_connection():
     """Test SMTP connection and authentication"""
+    # Read the settings once, the same ones EmailSender uses
+    server_host, port, user, password, sender, timeout = (
+        config.SMTP_SERVER, config.SMTP_PORT, config.SMTP_USERNAME,
+        config.SMTP_PASSWORD, config.SMTP_SENDER, config.SMTP_TIMEOUT_SECONDS
+    )
+    
     print("=" * 60)
     print("Testing SMTP Configuration")
     print("=" * 60)
     
     # Check configuration
-    print(f"\n1. Checking configuration...")
-    print(f"   SMTP Server: {config.SMTP_SERVER}")
-    print(f"   SMTP Port: {config.SMTP_PORT}")
-    print(f"   SMTP Username: {config.SMTP_USERNAME if config.SMTP_USERNAME else 'NOT SET'}")
-    print(f"   SMTP Password: {'SET' if config.SMTP_PASSWORD else 'NOT SET'}")
+    print("\n1. Checking configuration...")
+    print(f"   SMTP Server: {server_host}")
+    print(f"   SMTP Port: {port}")
+    print(f"   SMTP Username: {user if user else 'NOT SET'}")
+    print(f"   SMTP Password: {'SET' if password else 'NOT SET'}")
     print(f"   Email From: {config.EMAIL_FROM if config.EMAIL_FROM else 'NOT SET'}")
     
-    if not config.SMTP_USERNAME or not config.SMTP_PASSWORD:
+    if not user or not password:
         print("\n❌ ERROR: SMTP_USERNAME or SMTP_PASSWORD not set!")
         print("   Please set these in your .env file")
         return False
@@ -30,30 +50,24 @@ def test_smtp_connection():
         print("\n⚠️  WARNING: EMAIL_FROM not set, will use SMTP_USERNAME")
     
     # Test connection
-    print(f"\n2. Testing connection to {config.SMTP_SERVER}:{config.SMTP_PORT}...")
+    print(f"\n2. Testing connection to {server_host}:{port}...")
     try:
-        if config.SMTP_PORT == 465:
-            server = smtplib.SMTP_SSL(config.SMTP_SERVER, config.SMTP_PORT, timeout=30)
+        if port == 465:
+            server = smtplib.SMTP_SSL(server_host, port, timeout=timeout)
         else:
-            server = smtplib.SMTP(config.SMTP_SERVER, config.SMTP_PORT, timeout=30)
+            server = smtplib.SMTP(server_host, port, timeout=timeout)
             server.starttls()
         
         print("   ✅ Connection successful!")
         
         # Test authentication
-        print(f"\n3. Testing authentication...")
-        server.login(config.SMTP_USERNAME, config.SMTP_PASSWORD)
+        print("\n3. Testing authentication...")
+        server.login(user, password)
         print("   ✅ Authentication successful!")
         
         # Test sending email to yourself
-        print(f"\n4. Testing email send to {config.SMTP_USERNAME}...")
-        msg = MIMEMultipart()
-        msg['From'] = config.EMAIL_FROM or config.SMTP_USERNAME
-        msg['To'] = config.SMTP_USERNAME
-        msg['Subject'] = "Test Email from Lead Generation System"
-        msg.attach(MIMEText("This is a test email from your Lead Generation System. If you received this, your SMTP configuration is working correctly!", 'plain', 'utf-8'))
-        
-        server.send_message(msg)
+        print(f"\n4. Testing email send to {user}...")
+        server.sendmail(sender, [user], _TEST_MSG_BYTES)
         print("   ✅ Test email sent successfully!")
         
         server.quit()
@@ -74,10 +88,10 @@ def test_smtp_connection():
         
     except smtplib.SMTPConnectError as e:
         print(f"\n❌ Connection failed: {e}")
-        print(f"\nCheck:")
-        print(f"  • SMTP_SERVER is correct: {config.SMTP_SERVER}")
-        print(f"  • SMTP_PORT is correct: {config.SMTP_PORT}")
-        print(f"  • Firewall/network is not blocking the connection")
+        print("\nCheck:")
+        print(f"  • SMTP_SERVER is correct: {server_host}")
+        print(f"  • SMTP_PORT is correct: {port}")
+        print("  • Firewall/network is not blocking the connection")
         return False
         
     except Exception as e: